@@ -0,0 +1,93 @@
+"""
+Write-behind buffer for `User.last_accessed`.
+
+Accesses are recorded in a Redis hash (user id -> timestamp), at most once
+per user and process every LAST_ACCESSED_WINDOW seconds, and copied to the
+user table by `flush_last_accessed` every LAST_ACCESSED_FLUSH_INTERVAL
+seconds. A stored `last_accessed` is therefore at most the sum of both
+behind.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+
+log = logging.getLogger(__name__)
+
+LAST_ACCESSED_KEY = "authentication:last-accessed"
+# The batch being flushed; left in place (and flushed first) if a flush fails
+FLUSHING_KEY = "authentication:last-accessed:flushing"
+
+# user id -> monotonic time of the last access recorded by this process,
+# oldest first; entries older than the window are evicted as new ones arrive
+_recorded: OrderedDict[int, float] = OrderedDict()
+_recorded_lock = threading.Lock()
+
+_redis_client: redis.Redis | None = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def record_access(user_id: int, accessed_at: datetime) -> bool:
+    """
+    Buffer an access; returns False when one was recorded within the window.
+
+    Raises the Redis error when the buffer is unavailable so the caller can
+    save the timestamp synchronously instead.
+    """
+    now = time.monotonic()
+    window = settings.LAST_ACCESSED_WINDOW
+    with _recorded_lock:
+        while _recorded and now - next(iter(_recorded.values())) >= window:
+            _recorded.popitem(last=False)
+        if user_id in _recorded:
+            return False
+    _get_redis().hset(LAST_ACCESSED_KEY, user_id, accessed_at.timestamp())
+    with _recorded_lock:
+        _recorded[user_id] = now
+        _recorded.move_to_end(user_id)
+    return True
+
+
+def flush_last_accessed() -> int:
+    """
+    Copy the buffered timestamps to the user table in one bulk update.
+
+    The buffer is renamed before being read, so accesses recorded meanwhile
+    go to a fresh hash for the next flush. Returns the number of users
+    updated.
+    """
+    client = _get_redis()
+    try:
+        client.renamenx(LAST_ACCESSED_KEY, FLUSHING_KEY)
+    except redis.ResponseError:
+        # Nothing buffered; a batch left by a failed flush may still be pending
+        pass
+
+    entries = client.hgetall(FLUSHING_KEY)
+    if not entries:
+        return 0
+
+    User = get_user_model()
+    users = [
+        User(
+            pk=int(user_id),
+            last_accessed=datetime.fromtimestamp(float(value), tz=timezone.utc),
+        )
+        for user_id, value in entries.items()
+    ]
+    updated = User.objects.bulk_update(users, ["last_accessed"])
+    client.delete(FLUSHING_KEY)
+    return updated
@@ -1,11 +1,20 @@
-from django.utils import timezone
+import logging
 import re
 
+from django.utils import timezone
+
+from .last_accessed import record_access
+
+
+log = logging.getLogger(__name__)
+
 
 class LastAccessedMiddleware:
     """
     Middleware to update the last_accessed field for users when they successfully
     authenticate through the allauth session endpoint.
+    The timestamp is buffered (see `authentication.last_accessed`) and written
+    to the user table in bulk by a periodic task, not within the request.
     """
 
     def __init__(self, get_response):
@@ -17,13 +26,20 @@ class LastAccessedMiddleware:
         response = self.get_response(request)
 
         # Check if this is a successful request to the allauth session endpoint
+        # (cheapest checks first: most requests are not)
         if (
-            self.session_url_pattern.match(request.path)
+            response.status_code == 200
+            and request.path.startswith("/_allauth/")
+            and self.session_url_pattern.match(request.path)
             and request.user.is_authenticated
-            and response.status_code == 200
         ):
-            # Update the last_accessed timestamp
-            request.user.last_accessed = timezone.now()
-            request.user.save(update_fields=["last_accessed"])
+            now = timezone.now()
+            try:
+                record_access(request.user.pk, now)
+            except Exception as exc:
+                log.warning("Last accessed buffer unavailable; saving now: %s", exc)
+                # Update the last_accessed timestamp
+                request.user.last_accessed = now
+                request.user.save(update_fields=["last_accessed"])
 
         return response
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.8 on 2026-10-17 21:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def map_existing_sessions(apps, schema_editor):
+    """Decode the live sessions once so they are covered by single-session login."""
+    from django.contrib.sessions.backends.db import SessionStore
+
+    Session = apps.get_model("sessions", "Session")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    UserSession = apps.get_model("authentication", "UserSession")
+    user_ids = set(User.objects.values_list("pk", flat=True))
+    store = SessionStore()
+
+    batch = []
+    sessions = Session.objects.filter(expire_date__gte=timezone.now())
+    for session_key, session_data in sessions.values_list(
+        "session_key", "session_data"
+    ).iterator(chunk_size=2000):
+        user_id = store.decode(session_data).get("_auth_user_id")
+        if user_id is not None and int(user_id) in user_ids:
+            batch.append(UserSession(session_key=session_key, user_id=int(user_id)))
+        if len(batch) >= 2000:
+            UserSession.objects.bulk_create(batch)
+            batch = []
+    UserSession.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_user_last_accessed'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_key', models.CharField(max_length=40, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(map_existing_sessions, migrations.RunPython.noop),
+    ]
@@ -48,3 +48,15 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return self.user.email
+
+
+# Sessions of each user, so they can be found without decoding every session
+class UserSession(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="session_keys"
+    )
+    session_key = models.CharField(max_length=40, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.email} ({self.session_key})"
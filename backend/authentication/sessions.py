@@ -0,0 +1,70 @@
+"""
+Cached database sessions that coalesce expiry-only writes.
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+log = logging.getLogger(__name__)
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    Sessions read from the cache (Redis) and stored in the database.
+
+    With SESSION_SAVE_EVERY_REQUEST every request saves the session only to
+    slide its expiry. Such a save refreshes the cache entry (and with it the
+    expiry) and reaches the database at most once per
+    SESSION_PERSIST_INTERVAL seconds per session. New sessions, key rotation
+    and modified sessions (including set_expiry()) are written through
+    immediately, as is every save while the cache is unavailable or no
+    longer holds the session.
+    """
+
+    cache_key_prefix = "authentication.sessions"
+    # Appended to the cache key of a session recently written to the database
+    persisted_suffix = ":persisted"
+
+    @property
+    def persisted_key(self):
+        return self.cache_key + self.persisted_suffix
+
+    def save(self, must_create=False):
+        interval = settings.SESSION_PERSIST_INTERVAL
+        new = must_create or self.session_key is None
+        if new or self.modified or interval <= 0:
+            super().save(must_create)
+            if interval > 0:
+                self._mark_persisted(interval)
+            return
+
+        try:
+            # add() is atomic: only the first save of an interval writes through.
+            # A session missing from the cache (e.g. deleted meanwhile) is never
+            # recreated here: the write-through fails for a deleted row.
+            if not self._cache.add(
+                self.persisted_key, True, timeout=interval
+            ) and self._cache.touch(self.cache_key, self.get_expiry_age()):
+                return
+        except Exception as exc:
+            log.warning("Session cache unavailable; writing through: %s", exc)
+        super().save(must_create)
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(
+            self.cache_key_prefix + session_key + self.persisted_suffix
+        )
+
+    def _mark_persisted(self, interval: int):
+        try:
+            self._cache.set(self.persisted_key, True, timeout=interval)
+        except Exception as exc:
+            log.warning("Failed to mark session as persisted: %s", exc)
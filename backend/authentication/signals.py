@@ -1,21 +1,118 @@
+import logging
+from importlib import import_module
+
 from django.contrib.sessions.models import Session
-from django.contrib.auth.signals import user_logged_in
-from django.utils import timezone
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
 from django.conf import settings
 
+from .models import UserSession
+
+
+log = logging.getLogger(__name__)
+
+
+def track_session(sender, user, request, **kwargs):
+    # Map the session to its user on every login (login rotates the key)
+    session_key = request.session.session_key
+    if session_key:
+        UserSession.objects.update_or_create(
+            session_key=session_key, defaults={"user": user}
+        )
+
+
+def untrack_session(sender, user, request, **kwargs):
+    session_key = request.session.session_key
+    if session_key:
+        UserSession.objects.filter(session_key=session_key).delete()
+
 
 def terminate_other_sessions(sender, user, request, **kwargs):
     # Skip for superusers and only terminate other sessions if SINGLE_SESSION_PER_USER setting is enabled
     if not user.is_superuser and getattr(settings, "SINGLE_SESSION_PER_USER", True):
         current_session_key = request.session.session_key
-        sessions = Session.objects.filter(expire_date__gte=timezone.now())
-        for session in sessions:
-            data = session.get_decoded()
-            if (
-                data.get("_auth_user_id") == str(user.id)
-                and session.session_key != current_session_key
-            ):
-                session.delete()
+        # Indexed lookup of the user's sessions instead of decoding every session
+        other_session_keys = list(
+            UserSession.objects.filter(user=user)
+            .exclude(session_key=current_session_key)
+            .values_list("session_key", flat=True)
+        )
+        if not other_session_keys:
+            return
+        with transaction.atomic():
+            Session.objects.filter(session_key__in=other_session_keys).delete()
+            UserSession.objects.filter(session_key__in=other_session_keys).delete()
 
+        # Cached session backends would otherwise keep serving them
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        cache_key_prefix = getattr(session_store, "cache_key_prefix", None)
+        if cache_key_prefix:
+            cache_keys = [
+                cache_key_prefix + session_key for session_key in other_session_keys
+            ]
+            # Coalescing stores also keep a marker of the last database write
+            persisted_suffix = getattr(session_store, "persisted_suffix", None)
+            if persisted_suffix:
+                cache_keys += [cache_key + persisted_suffix for cache_key in cache_keys]
+            caches[settings.SESSION_CACHE_ALIAS].delete_many(cache_keys)
 
+
+user_logged_in.connect(track_session)
 user_logged_in.connect(terminate_other_sessions)
+user_logged_out.connect(untrack_session)
+
+
+@receiver(post_migrate)
+def create_authentication_schedules(sender, app_config=None, **kwargs):
+    """Ensure the periodic authentication tasks exist after migrations.
+
+    Runs only for the `authentication` app to avoid repeated work on other apps.
+    """
+    try:
+        if app_config is None or app_config.name != "authentication":
+            return
+
+        try:
+            from django_celery_beat.models import (
+                CrontabSchedule,
+                IntervalSchedule,
+                PeriodicTask,
+            )
+        except Exception as exc:  # pragma: no cover - defensive
+            log.warning(
+                "Celery beat models unavailable; skipping schedule creation: %s", exc
+            )
+            return
+
+        # Bounds how stale the buffered User.last_accessed can get
+        flush_every, _ = IntervalSchedule.objects.get_or_create(
+            every=settings.LAST_ACCESSED_FLUSH_INTERVAL,
+            period=IntervalSchedule.SECONDS,
+        )
+        task = "authentication.tasks.flush_last_accessed"
+        PeriodicTask.objects.update_or_create(
+            name="Flush buffered user last accessed times",
+            defaults={"interval": flush_every, "task": task},
+            create_defaults={"interval": flush_every, "task": task, "enabled": True},
+        )
+
+        # Nothing else deletes expired sessions (clearsessions is never run)
+        hourly, _ = CrontabSchedule.objects.get_or_create(
+            minute="45",
+            hour="*",
+            day_of_week="*",
+            day_of_month="*",
+            month_of_year="*",
+        )
+        PeriodicTask.objects.get_or_create(
+            crontab=hourly,
+            name="Clear expired sessions (hourly)",
+            task="authentication.tasks.clear_expired_sessions",
+            defaults={"enabled": True},
+        )
+    except Exception as exc:  # pragma: no cover - defensive
+        # Do not crash migrations for scheduling errors
+        log.warning("Failed to ensure authentication schedules post-migrate: %s", exc)
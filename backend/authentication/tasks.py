@@ -0,0 +1,99 @@
+import logging
+import time
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import last_accessed
+from .models import UserSession
+
+
+log = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_last_accessed() -> int:
+    """
+    Write the last accessed times buffered by LastAccessedMiddleware.
+
+    Scheduled every LAST_ACCESSED_FLUSH_INTERVAL seconds; all buffered users
+    are updated with a single bulk update. Returns the number of users.
+    """
+    flushed = last_accessed.flush_last_accessed()
+    if flushed:
+        log.info("Flushed last accessed time of %s users", flushed)
+    return flushed
+
+
+def _session_table_size() -> tuple[int, int]:
+    """Estimated rows and total on-disk bytes (indexes included) of the sessions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint, pg_total_relation_size(oid) "
+            "FROM pg_class WHERE oid = %s::regclass",
+            [Session._meta.db_table],
+        )
+        rows, size = cursor.fetchone()
+    # reltuples is -1 until the table is first vacuumed or analyzed
+    return max(rows, 0), size
+
+
+@shared_task
+def clear_expired_sessions() -> dict:
+    """
+    Delete expired sessions in small batches, within a time budget.
+
+    Each batch takes the SESSION_CLEANUP_BATCH_SIZE oldest expired keys (an
+    index scan on expire_date) and deletes them, with their user mappings, in
+    one short transaction. No new batch starts after
+    SESSION_CLEANUP_TIME_BUDGET seconds; the next run continues from there.
+    Mappings left by sessions deleted elsewhere are removed as well. Returns
+    the number of sessions removed and the size of the session table.
+    """
+    # A zero batch would never finish
+    batch_size = max(1, settings.SESSION_CLEANUP_BATCH_SIZE)
+    deadline = time.monotonic() + settings.SESSION_CLEANUP_TIME_BUDGET
+    now = timezone.now()
+    expired = Session.objects.filter(expire_date__lt=now).order_by("expire_date")
+
+    deleted_count = 0
+    while True:
+        session_keys = list(
+            expired.values_list("session_key", flat=True)[:batch_size]
+        )
+        batch_deleted = 0
+        if session_keys:
+            with transaction.atomic():
+                batch_deleted, _ = Session.objects.filter(
+                    session_key__in=session_keys
+                ).delete()
+                UserSession.objects.filter(session_key__in=session_keys).delete()
+            deleted_count += batch_deleted
+        finished = len(session_keys) < batch_size
+        # Nothing deleted: another run is clearing the same sessions
+        if finished or not batch_deleted or time.monotonic() >= deadline:
+            break
+
+    orphaned_count, _ = UserSession.objects.filter(
+        ~Exists(Session.objects.filter(session_key=OuterRef("session_key")))
+    ).delete()
+
+    table_rows, table_bytes = _session_table_size()
+    log.info(
+        "Cleared %s expired sessions (%s); session table: ~%s rows, %s bytes",
+        deleted_count,
+        "done" if finished else "time budget reached",
+        table_rows,
+        table_bytes,
+    )
+    return {
+        "deleted": deleted_count,
+        "finished": finished,
+        "orphaned_mappings": orphaned_count,
+        "table_rows": table_rows,
+        "table_bytes": table_bytes,
+    }
@@ -1,3 +1,406 @@
-from django.test import TestCase
+import os
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import redis
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.db import SessionStore as DBSessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import last_accessed
+from .models import UserSession
+from .sessions import SessionStore
+from .signals import terminate_other_sessions
+from .tasks import clear_expired_sessions, flush_last_accessed
+
+
+User = get_user_model()
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+# Benchmarks (tagged "slow") take minutes; they only run when asked to
+RUN_SLOW_TESTS = bool(os.environ.get("RUN_SLOW_TESTS"))
+
+
+def session_writes(queries) -> list[str]:
+    return [
+        query["sql"]
+        for query in queries
+        if query["sql"].startswith(("INSERT", "UPDATE"))
+        and "django_session" in query["sql"]
+    ]
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    SESSION_ENGINE="authentication.sessions",
+    SESSION_PERSIST_INTERVAL=300,
+)
+class CoalescingSessionStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        session = SessionStore()
+        session["_auth_user_id"] = "1"
+        session.create()
+        self.session_key = session.session_key
+
+    def refresh(self, times: int = 1):
+        # What SESSION_SAVE_EVERY_REQUEST does on a read-only request
+        for _ in range(times):
+            session = SessionStore(self.session_key)
+            session.load()
+            session.save()
+
+    def test_expiry_refreshes_are_coalesced(self):
+        with self.assertNumQueries(0):
+            self.refresh(20)
+
+        # The interval elapsed: the next refresh writes through, once
+        cache.delete(SessionStore(self.session_key).persisted_key)
+        with CaptureQueriesContext(connection) as queries:
+            self.refresh(20)
+        self.assertEqual(len(session_writes(queries)), 1)
+
+    def test_data_changes_are_written_through(self):
+        session = SessionStore(self.session_key)
+        session["cart"] = [1, 2]
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+
+        self.assertEqual(len(session_writes(queries)), 1)
+        stored = Session.objects.get(session_key=self.session_key).get_decoded()
+        self.assertEqual(stored["cart"], [1, 2])
+
+    def test_deleted_session_is_not_recreated(self):
+        stale = SessionStore(self.session_key)
+        stale.load()
+        SessionStore(self.session_key).delete()
+
+        # A request that loaded the session before it was deleted
+        with self.assertRaises(UpdateError):
+            stale.save()
+
+        self.assertIsNone(cache.get(stale.cache_key))
+        self.assertIsNone(cache.get(stale.persisted_key))
+        self.assertFalse(Session.objects.filter(session_key=self.session_key).exists())
+
+    def test_writes_through_without_cache(self):
+        session = SessionStore(self.session_key)
+        session.load()
+        with mock.patch.object(
+            session._cache, "add", side_effect=ConnectionError("redis down")
+        ), CaptureQueriesContext(connection) as queries:
+            session.save()
+
+        self.assertEqual(len(session_writes(queries)), 1)
+
+    @override_settings(SESSION_PERSIST_INTERVAL=0)
+    def test_zero_interval_writes_every_save(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.refresh(3)
+
+        self.assertEqual(len(session_writes(queries)), 3)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    SESSION_ENGINE="authentication.sessions",
+    SINGLE_SESSION_PER_USER=True,
+)
+class SingleSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("member@example.com", "secret")
+
+    def test_login_terminates_other_sessions(self):
+        first, second = Client(), Client()
+        first.force_login(self.user)
+        other_user = User.objects.create_user("other@example.com", "secret")
+        Client().force_login(other_user)
+
+        second.force_login(self.user)
+
+        self.assertFalse(
+            Session.objects.filter(session_key=first.session.session_key).exists()
+        )
+        # Not served from the session cache either
+        self.assertEqual(SessionStore(first.session.session_key).load(), {})
+        self.assertEqual(
+            list(self.user.session_keys.values_list("session_key", flat=True)),
+            [second.session.session_key],
+        )
+        self.assertEqual(other_user.session_keys.count(), 1)
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_terminated_session_stays_terminated(self):
+        first = Client()
+        first.force_login(self.user)
+        stale = SessionStore(first.session.session_key)
+        stale.load()
+
+        Client().force_login(self.user)
+
+        self.assertIsNone(cache.get(stale.persisted_key))
+        with self.assertRaises(UpdateError):
+            stale.save()
+        self.assertEqual(SessionStore(stale.session_key).load(), {})
+
+    def test_superuser_keeps_sessions(self):
+        admin = User.objects.create_superuser("admin@example.com", "secret")
+        Client().force_login(admin)
+        Client().force_login(admin)
+
+        self.assertEqual(admin.session_keys.count(), 2)
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_logout_removes_mapping(self):
+        client = Client()
+        client.force_login(self.user)
+
+        client.logout()
+
+        self.assertFalse(UserSession.objects.exists())
+
+
+class FakeRedisHashes:
+    """In-memory stand-in for the Redis commands used by the last accessed buffer."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+
+    def hset(self, key, field, value) -> int:
+        values = self.hashes.setdefault(key, {})
+        added = str(field).encode() not in values
+        values[str(field).encode()] = str(value).encode()
+        return int(added)
+
+    def hgetall(self, key) -> dict[bytes, bytes]:
+        return dict(self.hashes.get(key, {}))
+
+    def renamenx(self, key, new_key) -> bool:
+        if key not in self.hashes:
+            raise redis.ResponseError("no such key")
+        if new_key in self.hashes:
+            return False
+        self.hashes[new_key] = self.hashes.pop(key)
+        return True
+
+    def delete(self, key) -> int:
+        return int(self.hashes.pop(key, None) is not None)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LAST_ACCESSED_WINDOW=60)
+class LastAccessedTests(TestCase):
+    session_url = "/_allauth/browser/v1/auth/session"
+
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeRedisHashes()
+        patcher = mock.patch(
+            "authentication.last_accessed._get_redis", return_value=self.redis
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(last_accessed._recorded.clear)
+        self.user = User.objects.create_user("member@example.com", "secret")
+        self.client.force_login(self.user)
+
+    def test_accesses_are_buffered_and_flushed_in_bulk(self):
+        other = User.objects.create_user("other@example.com", "secret")
+        other_client = Client()
+        other_client.force_login(other)
+
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(3):
+                self.assertEqual(self.client.get(self.session_url).status_code, 200)
+            other_client.get(self.session_url)
+        self.client.get("/_allauth/browser/v1/config")
+
+        self.assertFalse(
+            any('UPDATE "authentication_user"' in q["sql"] for q in queries)
+        )
+        self.assertEqual(len(self.redis.hgetall(last_accessed.LAST_ACCESSED_KEY)), 2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_last_accessed(), 2)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_accessed)
+        self.assertEqual(self.redis.hashes, {})
+        self.assertEqual(flush_last_accessed(), 0)
+
+    def test_failed_flush_is_retried(self):
+        accessed_at = datetime(2025, 9, 1, 10, tzinfo=dt_timezone.utc)
+        last_accessed.record_access(self.user.pk, accessed_at)
+        with mock.patch.object(
+            User.objects, "bulk_update", side_effect=RuntimeError("database down")
+        ), self.assertRaises(RuntimeError):
+            flush_last_accessed()
+        # Recorded meanwhile: flushed after the pending batch
+        other = User.objects.create_user("other@example.com", "secret")
+        last_accessed.record_access(other.pk, accessed_at)
+
+        self.assertEqual(flush_last_accessed(), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_accessed, accessed_at)
+        self.assertEqual(flush_last_accessed(), 1)
+
+    def test_recorded_accesses_are_evicted_after_the_window(self):
+        accessed_at = datetime(2025, 9, 1, 10, tzinfo=dt_timezone.utc)
+        users = [
+            User.objects.create_user(f"user{index}@example.com", "secret")
+            for index in range(3)
+        ]
+        with mock.patch("authentication.last_accessed.time.monotonic") as monotonic:
+            monotonic.return_value = 1000.0
+            for user in users[:2]:
+                self.assertTrue(last_accessed.record_access(user.pk, accessed_at))
+            self.assertFalse(last_accessed.record_access(users[0].pk, accessed_at))
+
+            monotonic.return_value = 1060.0
+            self.assertTrue(last_accessed.record_access(users[2].pk, accessed_at))
+
+        self.assertEqual(list(last_accessed._recorded), [users[2].pk])
+
+    def test_saves_synchronously_without_redis(self):
+        with mock.patch(
+            "authentication.last_accessed._get_redis",
+            side_effect=ConnectionError("redis down"),
+        ):
+            self.client.get(self.session_url)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_accessed)
+
+
+@override_settings(SESSION_CLEANUP_BATCH_SIZE=2, SESSION_CLEANUP_TIME_BUDGET=60)
+class ExpiredSessionCleanupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("member@example.com", "secret")
+        now = timezone.now()
+        store = DBSessionStore()
+        for index, expire_date in enumerate(
+            [now - timedelta(days=days) for days in range(1, 6)]
+            + [now + timedelta(days=1)]
+        ):
+            session_key = f"{index:032d}"
+            Session.objects.create(
+                session_key=session_key,
+                session_data=store.encode({"_auth_user_id": str(self.user.pk)}),
+                expire_date=expire_date,
+            )
+            UserSession.objects.create(session_key=session_key, user=self.user)
+        # Its session was deleted without logging out
+        UserSession.objects.create(session_key="gone", user=self.user)
+
+    def test_deletes_expired_sessions_in_batches(self):
+        result = clear_expired_sessions()
+
+        self.assertEqual(result["deleted"], 5)
+        self.assertTrue(result["finished"])
+        self.assertEqual(result["orphaned_mappings"], 1)
+        self.assertGreater(result["table_bytes"], 0)
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)),
+            [f"{5:032d}"],
+        )
+        self.assertEqual(
+            list(UserSession.objects.values_list("session_key", flat=True)),
+            [f"{5:032d}"],
+        )
+
+    @override_settings(SESSION_CLEANUP_BATCH_SIZE=0)
+    def test_zero_batch_size_still_finishes(self):
+        result = clear_expired_sessions()
+
+        self.assertEqual(result["deleted"], 5)
+        self.assertTrue(result["finished"])
+
+    @override_settings(SESSION_CLEANUP_TIME_BUDGET=0)
+    def test_stops_at_time_budget(self):
+        result = clear_expired_sessions()
+
+        # One batch, the oldest sessions first; the next run continues
+        self.assertEqual(result["deleted"], 2)
+        self.assertFalse(result["finished"])
+        self.assertFalse(
+            Session.objects.filter(session_key__in=[f"{3:032d}", f"{4:032d}"]).exists()
+        )
+        self.assertEqual(clear_expired_sessions()["deleted"], 2)
+
+
+class _Request:
+    def __init__(self, session):
+        self.session = session
+
+
+@tag("slow")
+@skipUnless(RUN_SLOW_TESTS, "set RUN_SLOW_TESTS=1 to run benchmarks")
+@override_settings(CACHES=LOCMEM_CACHES, SINGLE_SESSION_PER_USER=True)
+class SingleSessionBenchmark(TestCase):
+    """Login cost with 100k live sessions: decode-every-session vs the mapping."""
+
+    count = 100_000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("member@example.com", "secret")
+        others = User.objects.bulk_create(
+            User(email=f"user{index}@example.com") for index in range(100)
+        )
+        expire_date = timezone.now() + timedelta(days=400)
+        store = DBSessionStore()
+        sessions, mappings = [], []
+        for index in range(cls.count):
+            user = cls.user if index % 10_000 == 0 else others[index % len(others)]
+            session_key = f"{index:032d}"
+            sessions.append(
+                Session(
+                    session_key=session_key,
+                    session_data=store.encode({"_auth_user_id": str(user.pk)}),
+                    expire_date=expire_date,
+                )
+            )
+            mappings.append(UserSession(session_key=session_key, user=user))
+        Session.objects.bulk_create(sessions, batch_size=5000)
+        UserSession.objects.bulk_create(mappings, batch_size=5000)
+
+    def decode_all(self, current_session_key):
+        # The previous implementation, kept here as the baseline
+        for session in Session.objects.filter(expire_date__gte=timezone.now()):
+            data = session.get_decoded()
+            if (
+                data.get("_auth_user_id") == str(self.user.id)
+                and session.session_key != current_session_key
+            ):
+                session.delete()
+
+    def test_login_cost(self):
+        current_session_key = f"{0:032d}"
+        request = _Request(DBSessionStore(session_key=current_session_key))
+
+        started = time.perf_counter()
+        # Key lookup and two bulk deletes (in a savepoint), all indexed
+        with self.assertNumQueries(5):
+            terminate_other_sessions(None, self.user, request)
+        mapped_seconds = time.perf_counter() - started
+        self.assertEqual(Session.objects.count(), self.count - 9)
+        self.assertEqual(self.user.session_keys.count(), 1)
+
+        started = time.perf_counter()
+        self.decode_all(current_session_key)
+        decoded_seconds = time.perf_counter() - started
+
+        print(
+            f"\n{self.count} sessions: decode all {decoded_seconds * 1000:.0f} ms, "
+            f"indexed mapping {mapped_seconds * 1000:.1f} ms"
+        )
+        self.assertLess(mapped_seconds * 100, decoded_seconds)
@@ -167,6 +167,18 @@ SESSION_SAVE_EVERY_REQUEST = (
     os.getenv("DJANGO_SESSION_SAVE_EVERY_REQUEST", "True") == "True"
 )
 
+# Opt in to "authentication.sessions" to read sessions from the cache (Redis);
+# saves that only slide the expiry then reach the database at most once per
+# interval (seconds, 0 writes every save)
+SESSION_ENGINE = os.getenv(
+    "DJANGO_SESSION_ENGINE", "django.contrib.sessions.backends.db"
+)
+SESSION_PERSIST_INTERVAL = int(os.getenv("DJANGO_SESSION_PERSIST_INTERVAL", "300"))
+
+# Expired sessions are deleted hourly, in batches, for at most the time budget
+SESSION_CLEANUP_BATCH_SIZE = int(os.getenv("DJANGO_SESSION_CLEANUP_BATCH_SIZE", "1000"))
+SESSION_CLEANUP_TIME_BUDGET = int(os.getenv("DJANGO_SESSION_CLEANUP_TIME_BUDGET", "60"))
+
 
 # ---------------------------------------------------------------------------- #
 #                                INSTALLED APPS                                #
@@ -316,6 +328,14 @@ REDIS_DB = os.getenv("REDIS_DB")
 
 REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
 
+# Shared cache (e.g. latest Ecowitt observation served by the realtime endpoint)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("DJANGO_CACHE_URL", REDIS_URL),
+    }
+}
+
 # ---------------------------------------------------------------------------- #
 #                             Internationalization                             #
 # ---------------------------------------------------------------------------- #
@@ -385,6 +405,12 @@ AUTH_USER_MODEL = "authentication.User"
 # Single session per user
 SINGLE_SESSION_PER_USER = os.getenv("SINGLE_SESSION_PER_USER", "True") == "True"
 
+# User.last_accessed is buffered in Redis: recorded at most once per user every
+# LAST_ACCESSED_WINDOW seconds and written in bulk every
+# LAST_ACCESSED_FLUSH_INTERVAL seconds (staleness is at most the sum of both)
+LAST_ACCESSED_WINDOW = int(os.getenv("LAST_ACCESSED_WINDOW", "60"))
+LAST_ACCESSED_FLUSH_INTERVAL = int(os.getenv("LAST_ACCESSED_FLUSH_INTERVAL", "60"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -13,16 +13,22 @@ mkdir -p data
 
 echo "Starting server..."
 
-gunicorn core.wsgi:application --forwarded-allow-ips="*" --bind 0.0.0.0:8000
+# Served through ASGI (uvicorn workers under gunicorn, same worker count as before)
+# so long-lived streams (e.g. /ecowitt/stream) do not pin workers
+gunicorn core.asgi:application -k uvicorn_worker.UvicornWorker --forwarded-allow-ips="*" --bind 0.0.0.0:8000
 
 #####################################################################################
 # Options to DEBUG Django server
 # Optional commands to replace abouve gunicorn command
 
 # Option 1:
+# run the previous WSGI server (no streaming endpoints)
+# gunicorn core.wsgi:application --forwarded-allow-ips="*" --bind 0.0.0.0:8000
+
+# Option 2:
 # run gunicorn with debug log level
 # gunicorn server.wsgi --bind 0.0.0.0:8000 --workers 1 --threads 1 --log-level debug
 
-# Option 2:
+# Option 3:
 # run development server
 # DEBUG=True ./manage.py runserver 0.0.0.0:8000
\ No newline at end of file
@@ -1,6 +1,11 @@
 from django.contrib import admin
 
-from .models import EcowittObservation, EcowittObservation5Min
+from .models import (
+    EcowittObservation,
+    EcowittObservation1Day,
+    EcowittObservation1Hour,
+    EcowittObservation5Min,
+)
 
 
 @admin.register(EcowittObservation)
@@ -25,7 +30,7 @@ class EcowittObservationAdmin(admin.ModelAdmin):
     list_per_page = 50
 
 
-@admin.register(EcowittObservation5Min)
+@admin.register(EcowittObservation5Min, EcowittObservation1Hour, EcowittObservation1Day)
 class EcowittObservation5MinAdmin(admin.ModelAdmin):
     list_display = (
         "bucket_start",
@@ -0,0 +1,152 @@
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.functions import TruncDate
+
+from .models import (
+    EcowittArchiveDay,
+    EcowittObservation,
+    EcowittObservation1Day,
+    EcowittObservation1Hour,
+    EcowittObservation5Min,
+)
+
+
+log = logging.getLogger(__name__)
+
+# Archived tables: dataset name (directory) and the time column rows are filed by
+ARCHIVE_DATASETS = {
+    EcowittObservation: ("raw", "dateutc"),
+    EcowittObservation5Min: ("5min", "bucket_start"),
+    EcowittObservation1Hour: ("hour", "bucket_start"),
+    EcowittObservation1Day: ("day", "bucket_start"),
+}
+
+
+def _get_archive_root() -> Path:
+    raw_value = os.getenv("ECOWITT_ARCHIVE_DIR", "")
+    if not raw_value:
+        # Default to the media volume, which is already persisted
+        return Path(settings.MEDIA_ROOT) / "ecowitt-archive"
+    return Path(raw_value)
+
+
+def archive_path(dataset: str, day) -> Path:
+    """Compressed NDJSON file holding one UTC day of `dataset`."""
+    return _get_archive_root() / dataset / f"{day:%Y}" / f"{day:%Y-%m-%d}.ndjson.gz"
+
+
+def _read_day(path: Path) -> list[dict]:
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _write_day(path: Path, rows: list[dict]) -> None:
+    # Write next to the target and rename, so readers never see a partial file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.partial")
+    with gzip.open(partial, "wt", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row))
+            handle.write("\n")
+    os.replace(partial, path)
+
+
+def archive_expired(
+    model, threshold: datetime, heartbeat: Callable[[], None] | None = None
+) -> int:
+    """
+    Export the rows of `model` older than `threshold` to their day files.
+
+    Called right before the retention purge deletes those rows. A day that is
+    only partly expired is archived again on the next run: rows are merged
+    into the existing file by primary key, so re-archiving is idempotent.
+    `heartbeat` is called after every day written. Returns the number of rows
+    exported.
+    """
+    dataset, time_field = ARCHIVE_DATASETS[model]
+    expired = model.objects.filter(**{f"{time_field}__lt": threshold})
+    days = (
+        expired.annotate(day=TruncDate(time_field, tzinfo=dt_timezone.utc))
+        .values_list("day", flat=True)
+        .distinct()
+    )
+    attnames = [field.attname for field in model._meta.concrete_fields]
+
+    exported_count = 0
+    for day in sorted(days):
+        day_start = datetime(day.year, day.month, day.day, tzinfo=dt_timezone.utc)
+        rows = list(
+            expired.filter(
+                **{
+                    f"{time_field}__gte": day_start,
+                    f"{time_field}__lt": day_start + timedelta(days=1),
+                }
+            ).values(*attnames)
+        )
+        path = archive_path(dataset, day)
+        merged = {}
+        if path.exists():
+            merged = {row["id"]: row for row in _read_day(path)}
+        for row in rows:
+            # Same JSON types as rows read back from the file (ISO 8601 strings)
+            merged[row["id"]] = json.loads(json.dumps(row, cls=DjangoJSONEncoder))
+        _write_day(
+            path,
+            sorted(merged.values(), key=lambda row: (row[time_field], row["id"])),
+        )
+        EcowittArchiveDay.objects.update_or_create(
+            dataset=dataset, day=day, defaults={"row_count": len(merged)}
+        )
+        exported_count += len(rows)
+        if heartbeat is not None:
+            heartbeat()
+
+    if exported_count:
+        log.info(
+            "Archived %s %s rows older than %s",
+            exported_count,
+            model.__name__,
+            threshold.isoformat(),
+        )
+    return exported_count
+
+
+def load_archived(model, start: datetime, end: datetime) -> list:
+    """
+    Archived rows of `model` within [start, end), as unsaved instances ordered
+    by time. Only days present in the archive index are read.
+    """
+    dataset, time_field = ARCHIVE_DATASETS[model]
+    days = EcowittArchiveDay.objects.filter(
+        dataset=dataset,
+        day__gte=start.astimezone(dt_timezone.utc).date(),
+        day__lte=(end - timedelta(microseconds=1)).astimezone(dt_timezone.utc).date(),
+    ).values_list("day", flat=True)
+    fields = model._meta.concrete_fields
+
+    instances = []
+    for day in sorted(days):
+        path = archive_path(dataset, day)
+        try:
+            rows = _read_day(path)
+        except OSError as exc:
+            log.warning("Failed to read archived %s day %s: %s", dataset, day, exc)
+            continue
+        for row in rows:
+            instance = model(
+                **{
+                    field.attname: field.to_python(row.get(field.attname))
+                    for field in fields
+                }
+            )
+            if start <= getattr(instance, time_field) < end:
+                instances.append(instance)
+    return instances
@@ -0,0 +1,168 @@
+import codecs
+import csv
+import gzip
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+
+from .models import EcowittObservation
+from .serializers import EcowittObservationSerializer, parse_observation
+from .tasks import aggregate_observations_5min, mark_dirty_buckets
+
+
+log = logging.getLogger(__name__)
+
+BACKFILL_FORMATS = ("csv", "ndjson")
+BACKFILL_FIELDS = EcowittObservationSerializer.Meta.fields
+
+# Rows per COPY round trip: bounds memory however large the upload is
+COPY_CHUNK_ROWS = 5000
+# Invalid rows reported back individually; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+STAGING_TABLE = "ecowitt_backfill_staging"
+_COLUMNS = ", ".join(f'"{name}"' for name in BACKFILL_FIELDS)
+_TABLE = EcowittObservation._meta.db_table
+
+# First occurrence of each dateutc in the file, unless already stored (natural
+# key). Returns the inserted rows per 5-minute bucket (same bins as
+# `_FiveMinuteBin`).
+INSERT_SQL = (
+    "WITH inserted AS ("
+    f'INSERT INTO "{_TABLE}" (created_at, {_COLUMNS}) '
+    f"SELECT now(), {_COLUMNS} FROM ("
+    f"SELECT DISTINCT ON (dateutc) * FROM {STAGING_TABLE} ORDER BY dateutc, line"
+    ") AS staged ORDER BY dateutc "
+    "ON CONFLICT (dateutc) DO NOTHING RETURNING dateutc) "
+    "SELECT date_bin('5 minutes', dateutc, '2000-01-01 00:00:00+00'), count(*) "
+    "FROM inserted GROUP BY 1 ORDER BY 1"
+)
+
+
+class BackfillError(ValueError):
+    """The upload itself is unreadable (bad gzip, encoding or CSV framing)."""
+
+
+@dataclass
+class BackfillResult:
+    received: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    buckets: int = 0
+    errors: list[dict] = field(default_factory=list)
+
+
+def _records(stream, fmt: str, compressed: bool):
+    """Yield `(line, record, error)` for every row of the upload, lazily."""
+    if compressed:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    # Line by line from any readable stream (request body, gzip or plain file)
+    text = codecs.iterdecode(stream, "utf-8")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+    for line, raw_line in enumerate(text, start=1):
+        if not raw_line.strip():
+            continue
+        try:
+            record = json.loads(raw_line)
+        except ValueError as exc:
+            yield line, None, {"non_field_errors": [f"Invalid JSON: {exc}"]}
+            continue
+        if not isinstance(record, dict):
+            yield line, None, {"non_field_errors": ["Expected a JSON object."]}
+            continue
+        yield line, record, None
+
+
+def _copy(cursor, rows: list[list]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {STAGING_TABLE} (line, {_COLUMNS}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def _reaggregate(bucket_starts: list) -> int:
+    """
+    Have the 5-minute buckets (and rollups) that received rows recomputed.
+
+    They are marked dirty for `aggregate_observations_5min`, which recomputes
+    them under the `aggregation` lock, so a backfill never races aggregation,
+    finalization or the purge on the same buckets. A run is requested right
+    away; the periodic run picks the marks up otherwise.
+    """
+    if not bucket_starts:
+        return 0
+    mark_dirty_buckets(bucket_starts)
+    try:
+        aggregate_observations_5min.apply_async(retry=False)
+    except Exception as exc:
+        log.warning("Failed to schedule backfill re-aggregation: %s", exc)
+    return len(bucket_starts)
+
+
+def import_observations(stream, fmt: str, compressed: bool = False) -> BackfillResult:
+    """
+    Load historical observations from a CSV or NDJSON byte stream.
+
+    Rows are read and validated one at a time with the ingest schema, staged
+    with COPY in COPY_CHUNK_ROWS chunks and inserted in one statement that
+    skips dateutc values already stored (or repeated in the file). Invalid
+    rows are skipped and reported. The affected buckets are marked for
+    re-aggregation at the end. Raises BackfillError when the upload cannot be
+    read.
+    """
+    result = BackfillResult()
+    valid = 0
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {STAGING_TABLE} ON COMMIT DROP AS "
+                f'SELECT 0 AS line, {_COLUMNS} FROM "{_TABLE}" WITH NO DATA'
+            )
+            chunk = []
+            for line, record, errors in _records(stream, fmt, compressed):
+                result.received += 1
+                if errors is None:
+                    values, errors = parse_observation(record)
+                if errors:
+                    result.invalid += 1
+                    if len(result.errors) < MAX_REPORTED_ERRORS:
+                        result.errors.append({"line": line, "errors": errors})
+                    continue
+                values["dateutc"] = values["dateutc"].isoformat()
+                chunk.append([line, *(values[name] for name in BACKFILL_FIELDS)])
+                valid += 1
+                if len(chunk) >= COPY_CHUNK_ROWS:
+                    _copy(cursor, chunk)
+                    chunk = []
+            if chunk:
+                _copy(cursor, chunk)
+
+            cursor.execute(INSERT_SQL)
+            inserted_buckets = cursor.fetchall()
+            cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+    except (OSError, EOFError, UnicodeDecodeError, csv.Error) as exc:
+        raise BackfillError(f"Unreadable upload: {exc}") from exc
+
+    result.inserted = sum(count for _, count in inserted_buckets)
+    result.duplicates = valid - result.inserted
+    result.buckets = _reaggregate([bucket for bucket, _ in inserted_buckets])
+    log.info(
+        "Backfilled %s Ecowitt observations (%s duplicates, %s invalid rows, "
+        "%s buckets marked for re-aggregation)",
+        result.inserted,
+        result.duplicates,
+        result.invalid,
+        result.buckets,
+    )
+    return result
@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import metrics
+from .models import EcowittObservation
+
+
+log = logging.getLogger(__name__)
+
+INGEST_BUFFER_KEY = "ecowitt:ingest-buffer"
+
+OBSERVATIONS_BUFFERED = metrics.Counter(
+    "ingest_observations_buffered",
+    "Observations appended to the write-behind ingest buffer",
+)
+OBSERVATIONS_FLUSHED = metrics.Counter(
+    "ingest_observations_flushed",
+    "Buffered observations written to the database by the flusher",
+)
+
+
+def get_ingest_mode() -> str:
+    raw_value = os.getenv("ECOWITT_INGEST_MODE", "")
+    if not raw_value:
+        # Default to storing every observation within the request
+        return "sync"
+    if raw_value not in ("sync", "buffered"):
+        log.warning(
+            "Invalid ECOWITT_INGEST_MODE='%s'. Falling back to sync.", raw_value
+        )
+        return "sync"
+    return raw_value
+
+
+def _get_flush_batch_size() -> int:
+    raw_value = os.getenv("ECOWITT_INGEST_FLUSH_BATCH_SIZE", "")
+    if not raw_value:
+        # Default to 500 observations per INSERT
+        return 500
+    try:
+        return max(int(raw_value), 1)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_INGEST_FLUSH_BATCH_SIZE='%s'. Falling back to 500.",
+            raw_value,
+        )
+        return 500
+
+
+def get_flush_delay_seconds() -> int:
+    raw_value = os.getenv("ECOWITT_INGEST_FLUSH_DELAY_SECONDS", "")
+    if not raw_value:
+        # Default to flushing 2 seconds after the buffer stops being empty
+        return 2
+    try:
+        return max(int(raw_value), 0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_INGEST_FLUSH_DELAY_SECONDS='%s'. Falling back to 2.",
+            raw_value,
+        )
+        return 2
+
+
+_redis_client: redis.Redis | None = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def buffer_observation(validated_data: dict) -> int:
+    """Append validated observation fields to the buffer; returns its length.
+
+    Raises the Redis error when the buffer is unavailable so the caller can
+    store the observation synchronously instead.
+    """
+    length = _get_redis().rpush(
+        INGEST_BUFFER_KEY, json.dumps(validated_data, cls=DjangoJSONEncoder)
+    )
+    OBSERVATIONS_BUFFERED.inc()
+    return length
+
+
+def decode_observation(entry: bytes | str) -> EcowittObservation | None:
+    """Unsaved observation from a buffered (or spooled) JSON entry."""
+    try:
+        data = json.loads(entry)
+        return EcowittObservation(
+            **{
+                field.attname: field.to_python(data[field.attname])
+                for field in EcowittObservation._meta.concrete_fields
+                if field.attname in data
+            }
+        )
+    except Exception as exc:
+        # Validated before buffering; a corrupt entry must not block the rest
+        log.error("Dropping undecodable observation entry %r: %s", entry, exc)
+        return None
+
+
+def flush_buffer(on_flushed=None) -> int:
+    """
+    Insert buffered observations in arrival order, one batch per transaction.
+
+    Entries are pushed to the tail and read from the head by a single flusher,
+    so rows keep their arrival order. A batch is trimmed from the buffer only
+    after it has committed: a flusher killed in between inserts it again
+    (at-least-once), which the dateutc natural key makes harmless. `on_flushed`
+    is called with the newly inserted rows of each committed batch (e.g. to
+    feed the aggregation accumulator). Returns the number of rows inserted.
+    """
+    client = _get_redis()
+    batch_size = _get_flush_batch_size()
+    flushed_count = 0
+    while True:
+        entries = client.lrange(INGEST_BUFFER_KEY, 0, batch_size - 1)
+        if not entries:
+            break
+        observations = [
+            observation
+            for observation in map(decode_observation, entries)
+            if observation is not None
+        ]
+        with transaction.atomic():
+            # Retried readings already stored are dropped here
+            observations = EcowittObservation.objects.insert_new(observations)
+        # Only now drop the batch: a crash before this line re-inserts it
+        client.ltrim(INGEST_BUFFER_KEY, len(entries), -1)
+
+        flushed_count += len(observations)
+        OBSERVATIONS_FLUSHED.inc(len(observations))
+        if on_flushed is not None:
+            on_flushed(observations)
+    # Stops only on an empty buffer, so the next push schedules a new flush
+    return flushed_count
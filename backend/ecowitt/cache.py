@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+
+log = logging.getLogger(__name__)
+
+LATEST_OBSERVATION_CACHE_KEY = "ecowitt:latest-observation"
+HISTORY_VERSION_CACHE_KEY = "ecowitt:history-version:{day}"
+HISTORY_GENERATION_CACHE_KEY = "ecowitt:history-generation"
+HISTORY_CACHE_KEY = "ecowitt:history:{digest}"
+
+MADRID_TZ = ZoneInfo("Europe/Madrid")
+
+
+def get_latest_observation() -> dict | None:
+    """Return the cached serialized latest observation, or None on a cold cache.
+
+    Cache errors are treated as a miss so callers can fall back to the database.
+    """
+    try:
+        return cache.get(LATEST_OBSERVATION_CACHE_KEY)
+    except Exception as exc:
+        log.warning("Failed to read latest observation from cache: %s", exc)
+        return None
+
+
+def set_latest_observation(data: dict) -> bool:
+    """Store a serialized observation as the latest one.
+
+    Observations not newer than the cached one (e.g. replayed buffered
+    readings) do not replace it; False is returned for those. A cache error
+    is logged and counts as stored.
+    """
+    try:
+        cached = cache.get(LATEST_OBSERVATION_CACHE_KEY)
+        if cached is not None:
+            cached_dateutc = parse_datetime(cached["dateutc"])
+            new_dateutc = parse_datetime(data["dateutc"])
+            if cached_dateutc and new_dateutc and new_dateutc <= cached_dateutc:
+                return False
+        cache.set(LATEST_OBSERVATION_CACHE_KEY, data, timeout=None)
+    except Exception as exc:
+        log.warning("Failed to write latest observation to cache: %s", exc)
+    return True
+
+
+def madrid_days(bucket_starts: Iterable[datetime]) -> set[date]:
+    """Madrid-local days that contain the given UTC bucket starts."""
+    return {bucket_start.astimezone(MADRID_TZ).date() for bucket_start in bucket_starts}
+
+
+def _get_or_create_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # Nanosecond clock so a recreated key never reuses an evicted value
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_history_version(start_day: date, end_day: date | None = None) -> str | None:
+    """Version of the history of Madrid-local days [start_day, end_day].
+
+    Changes whenever any bucket of those days is written. Returns None when the
+    cache is unavailable so callers skip validation.
+    """
+    end_day = end_day or start_day
+    days = [
+        start_day + timedelta(days=offset)
+        for offset in range((end_day - start_day).days + 1)
+    ]
+    keys = [HISTORY_VERSION_CACHE_KEY.format(day=day.isoformat()) for day in days]
+    try:
+        generation = _get_or_create_version(HISTORY_GENERATION_CACHE_KEY)
+        versions = cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                versions[key] = _get_or_create_version(key)
+    except Exception as exc:
+        log.warning("Failed to read history version for %s: %s", start_day, exc)
+        return None
+
+    if len(keys) == 1:
+        return f"{generation}.{versions[keys[0]]}"
+    digest = hashlib.sha1(
+        ",".join(str(versions[key]) for key in keys).encode()
+    ).hexdigest()
+    return f"{generation}.{digest[:16]}"
+
+
+def bump_history_versions(days: Iterable[date]) -> None:
+    """Invalidate the history of the given Madrid-local days (re-aggregated)."""
+    try:
+        for day in days:
+            _bump_version(HISTORY_VERSION_CACHE_KEY.format(day=day.isoformat()))
+    except Exception as exc:
+        log.warning("Failed to bump history versions: %s", exc)
+
+
+def bump_history_generation() -> None:
+    """Invalidate the history of every day at once (e.g. after a purge)."""
+    try:
+        _bump_version(HISTORY_GENERATION_CACHE_KEY)
+    except Exception as exc:
+        log.warning("Failed to bump history generation: %s", exc)
+
+
+def history_cache_key(version: str, *params) -> str:
+    """Cache key of a history payload.
+
+    The key embeds the days' version, so re-aggregating any of them makes
+    previous entries unreachable (they then simply expire).
+    """
+    digest = hashlib.sha1(repr((version, *params)).encode()).hexdigest()
+    return HISTORY_CACHE_KEY.format(digest=digest)
+
+
+def get_cached_history(key: str):
+    try:
+        return cache.get(key)
+    except Exception as exc:
+        log.warning("Failed to read history from cache: %s", exc)
+        return None
+
+
+def set_cached_history(key: str, data, timeout: int) -> None:
+    try:
+        cache.set(key, data, timeout=timeout)
+    except Exception as exc:
+        log.warning("Failed to write history to cache: %s", exc)
@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, ys: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling for series sharing one x axis.
+
+    Args:
+        x (np.ndarray): Strictly increasing x values, shape (n,)
+        ys (np.ndarray): One column per series, shape (n, m)
+        max_points (int): Maximum number of points to keep (>= 3)
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points, always including the
+        first and last one. Within each bucket the point kept is the one that
+        forms the largest triangle in *any* series (series are normalized to
+        [0, 1] first), so a peak in one metric is never averaged away by the
+        others. Rows stay aligned across series.
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    # Normalize every axis so areas are comparable across series
+    x = (x - x[0]) / ((x[-1] - x[0]) or 1.0)
+    low = ys.min(axis=0)
+    span = ys.max(axis=0) - low
+    span[span == 0] = 1.0
+    ys = (ys - low) / span
+
+    # Interior points [1, n - 1) split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    edges[-1] = n - 1
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+
+        # Third vertex: average point of the next bucket
+        c_x = x[next_start:next_end].mean()
+        c_y = ys[next_start:next_end].mean(axis=0)
+
+        # Twice the triangle area for every candidate (rows) and series (columns)
+        areas = np.abs(
+            (x[a] - c_x) * (ys[start:end] - ys[a])
+            - (x[a] - x[start:end, None]) * (c_y - ys[a])
+        )
+        a = start + int(areas.max(axis=1).argmax())
+        selected[bucket + 1] = a
+
+    return selected
@@ -0,0 +1,152 @@
+import functools
+import logging
+import os
+import uuid
+from typing import Callable
+
+from django.core.cache import cache
+
+from . import metrics
+
+
+log = logging.getLogger(__name__)
+
+LOCK_CACHE_KEY = "ecowitt:lock:{name}"
+PENDING_CACHE_KEY = "ecowitt:lock:{name}:pending:{task}"
+
+RUNS_COALESCED = metrics.Counter(
+    "task_runs_coalesced",
+    "Task runs folded into the run holding the same lock",
+)
+RUNS_SKIPPED = metrics.Counter(
+    "task_runs_skipped",
+    "Task runs dropped because an identical run was already queued behind the lock",
+)
+
+# Functions sharing each lock, by task name, so the holder can run queued ones
+_registry: dict[str, dict[str, Callable]] = {}
+# Tokens of the leases held by this process, by lock name
+_held: dict[str, str] = {}
+
+
+def _get_lease_seconds() -> int:
+    raw_value = os.getenv("ECOWITT_TASK_LEASE_SECONDS", "")
+    if not raw_value:
+        # Default to a 15-minute lease, far longer than a normal run
+        return 900
+    try:
+        return max(int(raw_value), 1)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_TASK_LEASE_SECONDS='%s'. Falling back to 900.",
+            raw_value,
+        )
+        return 900
+
+
+def single_flight(lock: str):
+    """
+    Run the decorated task under a lease shared by every task using `lock`.
+
+    An invocation that finds the lease taken returns None immediately after
+    queueing itself: the holder runs each queued task once more (without
+    arguments) before releasing, so overlapping requests coalesce into the
+    running one. A request for a task already queued is skipped. The lease
+    expires on its own if the holder dies; runs that may outlast it call
+    `renew_lease` between batches. When the cache is unavailable the task
+    runs unguarded; every guarded task is idempotent.
+    """
+
+    def decorator(func):
+        _registry.setdefault(lock, {})[func.__name__] = func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = LOCK_CACHE_KEY.format(name=lock)
+            token = uuid.uuid4().hex
+            lease_seconds = _get_lease_seconds()
+            try:
+                acquired = cache.add(key, token, timeout=lease_seconds)
+            except Exception as exc:
+                log.warning("Failed to acquire lock %s: %s", lock, exc)
+                return func(*args, **kwargs)
+
+            if not acquired:
+                _queue(lock, func.__name__, lease_seconds)
+                return None
+
+            _held[lock] = token
+            try:
+                result = func(*args, **kwargs)
+                _run_queued(lock, key, lease_seconds)
+                return result
+            finally:
+                _held.pop(lock, None)
+                _release(key, token)
+
+        return wrapper
+
+    return decorator
+
+
+def renew_lease(lock: str) -> None:
+    """
+    Extend the lease on `lock` held by the current run to a full lease again.
+
+    A no-op outside a run holding the lock. A lease that already expired and
+    was taken by another run is left alone.
+    """
+    token = _held.get(lock)
+    if token is None:
+        return
+    key = LOCK_CACHE_KEY.format(name=lock)
+    try:
+        if cache.get(key) == token:
+            cache.touch(key, _get_lease_seconds())
+        else:
+            log.warning("Lease on lock %s expired during the run", lock)
+    except Exception as exc:
+        log.warning("Failed to renew lock %s: %s", lock, exc)
+
+
+def _queue(lock: str, task: str, lease_seconds: int) -> None:
+    pending_key = PENDING_CACHE_KEY.format(name=lock, task=task)
+    try:
+        queued = cache.add(pending_key, True, timeout=lease_seconds)
+    except Exception as exc:
+        log.warning("Failed to queue %s behind lock %s: %s", task, lock, exc)
+        return
+    if queued:
+        RUNS_COALESCED.inc()
+        log.info("%s coalesced into the run holding lock %s", task, lock)
+    else:
+        RUNS_SKIPPED.inc()
+        log.info("%s skipped: already queued behind lock %s", task, lock)
+
+
+def _run_queued(lock: str, key: str, lease_seconds: int) -> None:
+    # Keep draining: a queued run may itself take long enough to be overlapped
+    while True:
+        ran = False
+        for task, func in _registry[lock].items():
+            try:
+                if not cache.delete(PENDING_CACHE_KEY.format(name=lock, task=task)):
+                    continue
+                cache.touch(key, lease_seconds)
+            except Exception as exc:
+                log.warning("Failed to read queued runs of lock %s: %s", lock, exc)
+                return
+            log.info("Running %s queued behind lock %s", task, lock)
+            func()
+            ran = True
+        if not ran:
+            return
+
+
+def _release(key: str, token: str) -> None:
+    try:
+        # Never release a lease that expired and was taken by another run
+        if cache.get(key) == token:
+            cache.delete(key)
+    except Exception as exc:
+        log.warning("Failed to release lock %s: %s", key, exc)
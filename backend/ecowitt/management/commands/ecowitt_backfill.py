@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecowitt.backfill import BACKFILL_FORMATS, BackfillError, import_observations
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical Ecowitt observations from a CSV or NDJSON export "
+        "(optionally gzip-compressed), skipping dateutc values already stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import (.csv, .ndjson, .gz)")
+        parser.add_argument(
+            "--format",
+            choices=BACKFILL_FORMATS,
+            help="Input format (default: from the file extension)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        name = path.lower().removesuffix(".gz")
+        fmt = options["format"]
+        if fmt is None:
+            if name.endswith(".csv"):
+                fmt = "csv"
+            elif name.endswith((".ndjson", ".jsonl")):
+                fmt = "ndjson"
+            else:
+                raise CommandError("Cannot infer the format; pass --format")
+
+        try:
+            with open(path, "rb") as stream:
+                result = import_observations(
+                    stream, fmt, compressed=path.lower().endswith(".gz")
+                )
+        except (OSError, BackfillError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {result.received} rows: inserted {result.inserted}, "
+                f"skipped {result.duplicates} duplicates and {result.invalid} "
+                f"invalid rows; queued {result.buckets} buckets for re-aggregation"
+            )
+        )
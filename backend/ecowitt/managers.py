@@ -0,0 +1,51 @@
+from django.db import connections, models
+
+
+class EcowittObservationManager(models.Manager):
+    """
+    Observation manager with an idempotent insert keyed on dateutc.
+    """
+
+    def insert_new(self, observations, batch_size: int = 500) -> list:
+        """
+        Insert the observations whose dateutc is not stored yet.
+
+        Runs `INSERT ... ON CONFLICT (dateutc) DO NOTHING` per batch, so a
+        retried reading costs one statement and never reaches the aggregates.
+        Within the given observations the first one per dateutc wins. Returns
+        the inserted observations, in order, with their primary key set.
+        """
+        connection = connections[self.db]
+        opts = self.model._meta
+        fields = [field for field in opts.concrete_fields if field is not opts.pk]
+        columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+        row_placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        table = connection.ops.quote_name(opts.db_table)
+
+        inserted = []
+        for index in range(0, len(observations), batch_size):
+            batch = observations[index : index + batch_size]
+            params = []
+            for observation in batch:
+                params += [
+                    field.get_db_prep_save(
+                        field.pre_save(observation, add=True), connection
+                    )
+                    for field in fields
+                ]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES "
+                    + ", ".join([row_placeholder] * len(batch))
+                    + " ON CONFLICT (dateutc) DO NOTHING RETURNING id, dateutc",
+                    params,
+                )
+                new_ids = {dateutc: pk for pk, dateutc in cursor.fetchall()}
+            for observation in batch:
+                pk = new_ids.pop(observation.dateutc, None)
+                if pk is not None:
+                    observation.pk = pk
+                    observation._state.adding = False
+                    observation._state.db = self.db
+                    inserted.append(observation)
+        return inserted
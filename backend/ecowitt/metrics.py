@@ -0,0 +1,59 @@
+import logging
+
+from django.core.cache import cache
+
+
+log = logging.getLogger(__name__)
+
+METRIC_CACHE_KEY = "ecowitt:metrics:{name}"
+
+# Every metric declared at import time, by name
+_registry: dict[str, "Metric"] = {}
+
+
+class Metric:
+    """
+    A process-independent metric stored in the shared cache.
+
+    Metrics are best effort: cache errors are logged and never propagate to
+    the request or task being measured.
+    """
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.key = METRIC_CACHE_KEY.format(name=name)
+        _registry[name] = self
+
+
+class Counter(Metric):
+    def inc(self, amount: int = 1) -> None:
+        try:
+            try:
+                cache.incr(self.key, amount)
+            except ValueError:
+                # First increment: create the key, then retry atomically
+                cache.add(self.key, 0, timeout=None)
+                cache.incr(self.key, amount)
+        except Exception as exc:
+            log.warning("Failed to increment metric %s: %s", self.name, exc)
+
+
+class Gauge(Metric):
+    def set(self, value: float) -> None:
+        try:
+            cache.set(self.key, value, timeout=None)
+        except Exception as exc:
+            log.warning("Failed to set metric %s: %s", self.name, exc)
+
+
+def snapshot() -> dict[str, float]:
+    """Current value of every declared metric (0 when never recorded)."""
+    try:
+        values = cache.get_many([metric.key for metric in _registry.values()])
+    except Exception as exc:
+        log.warning("Failed to read metrics: %s", exc)
+        values = {}
+    return {
+        name: values.get(metric.key, 0) for name, metric in sorted(_registry.items())
+    }
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.8 on 2025-09-12 18:04
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Build indexes without blocking ingest on the live tables
+    atomic = False
+
+    dependencies = [
+        ('ecowitt', '0002_ecowittobservation5min'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='ecowittobservation',
+            index=models.Index(fields=['-dateutc', '-created_at'], name='ecowitt_obs_latest_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ecowittobservation',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='ecowitt_obs_created_brin'),
+        ),
+        AddIndexConcurrently(
+            model_name='ecowittobservation5min',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='ecowitt_5min_created_brin'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.8 on 2026-10-17 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecowitt', '0004_hourly_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EcowittDirtyBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField(unique=True)),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
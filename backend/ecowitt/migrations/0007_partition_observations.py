@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations, transaction
+
+
+# Frozen copies of the table layout and partition helpers: the migration must
+# not change when ecowitt.partitions or ecowitt.tasks do.
+TABLE = "ecowitt_ecowittobservation"
+DEFAULT_PARTITION = f"{TABLE}_default"
+LEGACY_PARTITION = f"{TABLE}_legacy"
+PREVIOUS_TABLE = f"{TABLE}_previous"
+LEGACY_BOUNDS = "ecowitt_obs_legacy_bounds"
+
+INDEXES = {
+    "ecowitt_obs_latest_idx": "(dateutc DESC, created_at DESC)",
+    "ecowitt_obs_created_brin": "USING brin (created_at)",
+}
+
+# Daily partitions created for an empty table before now, and ahead of now
+HISTORY_DAYS = 7
+PREMAKE_DAYS = 7
+# Rows copied per transaction when reverting to a plain table
+COPY_BATCH_SIZE = 10_000
+
+
+def _day_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def _create_daily_partitions(cursor, start: datetime, until: datetime):
+    while start < until:
+        end = start + timedelta(days=1)
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}_p{start:%Y%m%d}" PARTITION OF "{TABLE}" '
+            "FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+        start = end
+
+
+def _create_indexes(cursor, table: str, primary_key: str):
+    cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ({primary_key})')
+    for name, definition in INDEXES.items():
+        cursor.execute(f'CREATE INDEX "{name}" ON "{table}" {definition}')
+
+
+def partition_observations(apps, schema_editor):
+    """
+    Turn the raw table into a table range-partitioned on dateutc.
+
+    Existing rows are not copied: the current table is attached as a single
+    partition covering everything up to a cutover two days ahead, and is
+    dropped as a whole once it expires. The index and bounds check it needs
+    to be attached without a scan are built first, without blocking ingest,
+    so the swap holds its exclusive lock for a few catalog updates only.
+    """
+    connection = schema_editor.connection
+    now = datetime.now(tz=timezone.utc)
+
+    with connection.cursor() as cursor:
+        # A partitioned table's primary key must include the partition key
+        cursor.execute(
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{LEGACY_PARTITION}_pkey" '
+            f'ON "{TABLE}" (id, dateutc)'
+        )
+        # Backed by ecowitt_obs_latest_idx
+        cursor.execute(f'SELECT min(dateutc), max(dateutc) FROM "{TABLE}"')
+        oldest, newest = cursor.fetchone()
+        lower = _day_start(oldest or now - timedelta(days=HISTORY_DAYS))
+        cutover = _day_start(max(newest or now, now)) + timedelta(days=2)
+
+        # Checked for new rows right away; VALIDATE scans without blocking writes
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{LEGACY_BOUNDS}" '
+            "CHECK (dateutc >= %s AND dateutc < %s) NOT VALID",
+            [lower, cutover],
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" VALIDATE CONSTRAINT "{LEGACY_BOUNDS}"')
+
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY_PARTITION}"')
+            cursor.execute(
+                f'ALTER TABLE "{LEGACY_PARTITION}" DROP CONSTRAINT "{TABLE}_pkey"'
+            )
+            cursor.execute(
+                f'ALTER TABLE "{LEGACY_PARTITION}" ADD CONSTRAINT '
+                f'"{LEGACY_PARTITION}_pkey" PRIMARY KEY USING INDEX '
+                f'"{LEGACY_PARTITION}_pkey"'
+            )
+            for name in INDEXES:
+                cursor.execute(
+                    f'ALTER INDEX "{name}" RENAME TO "{name.replace("_obs_", "_obs_legacy_")}"'
+                )
+
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY_PARTITION}" INCLUDING DEFAULTS) '
+                "PARTITION BY RANGE (dateutc)"
+            )
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM "{LEGACY_PARTITION}"')
+            (next_id,) = cursor.fetchone()
+            # Drops the legacy identity sequence; the parent hands out ids now
+            cursor.execute(
+                f'ALTER TABLE "{LEGACY_PARTITION}" ALTER COLUMN id DROP IDENTITY'
+            )
+            cursor.execute(
+                f'ALTER TABLE "{TABLE}" ALTER COLUMN id '
+                "ADD GENERATED BY DEFAULT AS IDENTITY"
+            )
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), %s, false)",
+                [next_id],
+            )
+            # Matched by the legacy indexes when it is attached
+            _create_indexes(cursor, TABLE, "id, dateutc")
+
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{LEGACY_PARTITION}")')
+            if cursor.fetchone()[0]:
+                # The validated check proves the bounds: attaching skips the scan
+                cursor.execute(
+                    f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{LEGACY_PARTITION}" '
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [lower, cutover],
+                )
+                cursor.execute(
+                    f'ALTER TABLE "{LEGACY_PARTITION}" DROP CONSTRAINT "{LEGACY_BOUNDS}"'
+                )
+                first_day = cutover
+            else:
+                cursor.execute(f'DROP TABLE "{LEGACY_PARTITION}"')
+                first_day = lower
+
+            # After the ranges are attached, so they need not scan it
+            cursor.execute(
+                f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT'
+            )
+            _create_daily_partitions(
+                cursor,
+                first_day,
+                max(first_day, _day_start(now) + timedelta(days=PREMAKE_DAYS + 1)),
+            )
+
+
+def unpartition_observations(apps, schema_editor):
+    """
+    Swap in a plain table, then copy the partitioned rows over in batches.
+
+    New rows go to the plain table as soon as it is swapped in; history
+    appears as the batches are committed.
+    """
+    connection = schema_editor.connection
+
+    with connection.cursor() as cursor:
+        with transaction.atomic(using=connection.alias):
+            cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{PREVIOUS_TABLE}"')
+            cursor.execute(
+                f'ALTER TABLE "{PREVIOUS_TABLE}" RENAME CONSTRAINT '
+                f'"{TABLE}_pkey" TO "{PREVIOUS_TABLE}_pkey"'
+            )
+            for name in INDEXES:
+                cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_previous"')
+
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}" (LIKE "{PREVIOUS_TABLE}" INCLUDING DEFAULTS)'
+            )
+            cursor.execute(
+                f'ALTER TABLE "{TABLE}" ALTER COLUMN id '
+                "ADD GENERATED BY DEFAULT AS IDENTITY"
+            )
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{PREVIOUS_TABLE}"')
+            (last_id,) = cursor.fetchone()
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), %s, false)",
+                [last_id + 1],
+            )
+            _create_indexes(cursor, TABLE, "id")
+
+        copied = 0
+        while copied < last_id:
+            with transaction.atomic(using=connection.alias):
+                cursor.execute(
+                    f'INSERT INTO "{TABLE}" SELECT * FROM "{PREVIOUS_TABLE}" '
+                    "WHERE id > %s AND id <= %s",
+                    [copied, copied + COPY_BATCH_SIZE],
+                )
+            copied += COPY_BATCH_SIZE
+
+        # Drops its partitions with it
+        cursor.execute(f'DROP TABLE "{PREVIOUS_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    # Index builds and the bounds check run outside the short swap transaction
+    atomic = False
+
+    dependencies = [
+        ("ecowitt", "0006_open_buckets"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_observations, unpartition_observations),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.8 on 2026-10-17 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecowitt', '0007_partition_observations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EcowittArchiveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.CharField(max_length=16)),
+                ('day', models.DateField()),
+                ('row_count', models.IntegerField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dataset', 'day'), name='ecowitt_archive_dataset_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.8 on 2026-10-17 20:58
+
+from datetime import timedelta, timezone
+
+from django.db import migrations, models, transaction
+
+
+TABLE = "ecowitt_ecowittobservation"
+
+# Duplicated dateutc values cleaned up per transaction
+DEDUPLICATE_BATCH_SIZE = 1000
+
+
+def deduplicate_observations(apps, schema_editor):
+    """Keep the first stored row per dateutc and re-aggregate affected buckets."""
+    EcowittDirtyBucket = apps.get_model("ecowitt", "EcowittDirtyBucket")
+    connection = schema_editor.connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT dateutc FROM "{TABLE}" GROUP BY dateutc HAVING count(*) > 1 '
+            "ORDER BY dateutc"
+        )
+        duplicated = [row[0] for row in cursor.fetchall()]
+
+    for index in range(0, len(duplicated), DEDUPLICATE_BATCH_SIZE):
+        batch = duplicated[index : index + DEDUPLICATE_BATCH_SIZE]
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM "{TABLE}" AS observation USING ('
+                f'SELECT dateutc, min(id) AS kept_id FROM "{TABLE}" '
+                "WHERE dateutc = ANY(%s) GROUP BY dateutc"
+                ") AS kept "
+                "WHERE observation.dateutc = kept.dateutc "
+                "AND observation.id <> kept.kept_id",
+                [batch],
+            )
+            # Their sample counts and averages included the duplicates
+            bucket_starts = {
+                dateutc.astimezone(timezone.utc).replace(second=0, microsecond=0)
+                - timedelta(minutes=dateutc.astimezone(timezone.utc).minute % 5)
+                for dateutc in batch
+            }
+            EcowittDirtyBucket.objects.bulk_create(
+                [
+                    EcowittDirtyBucket(bucket_start=bucket_start)
+                    for bucket_start in bucket_starts
+                ],
+                ignore_conflicts=True,
+            )
+
+
+class Migration(migrations.Migration):
+
+    # Each deduplication batch commits on its own
+    atomic = False
+
+    dependencies = [
+        ('ecowitt', '0008_archive_days'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_observations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ecowittobservation',
+            constraint=models.UniqueConstraint(fields=('dateutc',), name='ecowitt_obs_dateutc_uniq'),
+        ),
+    ]
@@ -1,5 +1,8 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 
+from .managers import EcowittObservationManager
+
 
 class EcowittObservation(models.Model):
     """
@@ -49,19 +52,35 @@ class EcowittObservation(models.Model):
     model = models.CharField(max_length=64)
     interval = models.IntegerField()
 
+    objects = EcowittObservationManager()
+
     class Meta:
         ordering = ["-dateutc", "-created_at"]
+        constraints = [
+            # Natural key: stations retry, a reading is stored once. Includes
+            # the partition key, as unique constraints on the raw table must
+            models.UniqueConstraint(
+                fields=["dateutc"], name="ecowitt_obs_dateutc_uniq"
+            ),
+        ]
+        indexes = [
+            # Latest-row lookups (realtime endpoint) and bucket range scans
+            models.Index(
+                fields=["-dateutc", "-created_at"], name="ecowitt_obs_latest_idx"
+            ),
+            # Append-only column: a tiny BRIN index covers the purge range scans
+            BrinIndex(fields=["created_at"], name="ecowitt_obs_created_brin"),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - readability only
         return f"EcowittObservation at {self.dateutc.isoformat()}"
 
 
-class EcowittObservation5Min(models.Model):
+class EcowittAggregate(models.Model):
     """
-    Aggregated 5-minute buckets derived from `EcowittObservation`.
+    Fields shared by every aggregation tier (5 minutes, 1 hour, 1 day).
 
-    Buckets are aligned to wall-clock boundaries, e.g., 00:00, 00:05, 00:10, ...
-    The bucket spans [bucket_start, bucket_start + 5 minutes).
+    Each row covers [bucket_start, bucket_start + tier length).
     """
 
     # Metadata
@@ -98,7 +117,103 @@ class EcowittObservation5Min(models.Model):
     totalrainin_last = models.FloatField()
 
     class Meta:
+        abstract = True
         ordering = ["-bucket_start", "-created_at"]
 
     def __str__(self) -> str:  # pragma: no cover - readability only
-        return f"EcowittObservation5Min bucket @ {self.bucket_start.isoformat()} ({self.sample_count} samples)"
+        return f"{type(self).__name__} bucket @ {self.bucket_start.isoformat()} ({self.sample_count} samples)"
+
+
+class EcowittObservation5Min(EcowittAggregate):
+    """
+    Aggregated 5-minute buckets derived from `EcowittObservation`.
+
+    Buckets are aligned to wall-clock boundaries, e.g., 00:00, 00:05, 00:10, ...
+    The bucket spans [bucket_start, bucket_start + 5 minutes).
+    """
+
+    class Meta(EcowittAggregate.Meta):
+        indexes = [
+            # bucket_start is already covered by its unique B-tree index
+            BrinIndex(fields=["created_at"], name="ecowitt_5min_created_brin"),
+        ]
+
+
+class EcowittObservation1Hour(EcowittAggregate):
+    """
+    Hourly rollup maintained incrementally from `EcowittObservation5Min`.
+
+    Averages are weighted by each 5-minute bucket's `sample_count`, extremes
+    use the maximum and cumulative rain fields the last bucket's value.
+    """
+
+    class Meta(EcowittAggregate.Meta):
+        indexes = [
+            BrinIndex(fields=["created_at"], name="ecowitt_1hour_created_brin"),
+        ]
+
+
+class EcowittObservation1Day(EcowittAggregate):
+    """
+    Daily rollup maintained incrementally from `EcowittObservation1Hour`.
+
+    Days are Europe/Madrid local days: `bucket_start` is local midnight (UTC).
+    """
+
+    class Meta(EcowittAggregate.Meta):
+        indexes = [
+            BrinIndex(fields=["created_at"], name="ecowitt_1day_created_brin"),
+        ]
+
+
+class EcowittOpenBucket(EcowittAggregate):
+    """
+    Running aggregate of the 5-minute bucket currently receiving observations.
+
+    Ingest folds every observation in as it arrives (running averages, maxima
+    and the latest cumulative values), so finalizing the bucket into
+    `EcowittObservation5Min` is a copy rather than a scan of raw rows.
+    """
+
+    # dateutc of the observation the *_last values come from
+    last_dateutc = models.DateTimeField()
+
+
+class EcowittDirtyBucket(models.Model):
+    """
+    A 5-minute bucket that received an observation after it had ended.
+
+    Ingest marks the bucket; the aggregator recomputes only marked buckets that
+    were already aggregated and then clears the marks.
+    """
+
+    bucket_start = models.DateTimeField(unique=True)
+    marked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover - readability only
+        return f"Dirty bucket @ {self.bucket_start.isoformat()}"
+
+
+class EcowittArchiveDay(models.Model):
+    """
+    Index of the cold archive: one UTC day of a dataset exported to disk.
+
+    Rows past their retention are written to compressed NDJSON day files
+    (see `ecowitt.archive`) before the purge deletes them; history requests
+    for archived ranges read the indexed files.
+    """
+
+    dataset = models.CharField(max_length=16)
+    day = models.DateField()
+    row_count = models.IntegerField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dataset", "day"], name="ecowitt_archive_dataset_day_uniq"
+            ),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover - readability only
+        return f"Archived {self.dataset} @ {self.day.isoformat()}"
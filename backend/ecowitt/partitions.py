@@ -0,0 +1,149 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, connection, transaction
+
+from .models import EcowittObservation
+
+
+log = logging.getLogger(__name__)
+
+# Raw observations are range-partitioned on dateutc (see migration 0007)
+PARENT_TABLE = EcowittObservation._meta.db_table
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+
+# How far ahead of now partitions are created
+PARTITION_PREMAKE_DAYS = 7
+
+_BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def _get_partition_interval() -> str:
+    raw_value = os.getenv("ECOWITT_OBSERVATION_PARTITION_INTERVAL", "")
+    if not raw_value:
+        # Default to daily partitions: retention is enforced at day granularity
+        return "day"
+    if raw_value not in ("day", "week"):
+        log.warning(
+            "Invalid ECOWITT_OBSERVATION_PARTITION_INTERVAL='%s'. Falling back to day.",
+            raw_value,
+        )
+        return "day"
+    return raw_value
+
+
+@dataclass
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+def is_partitioned() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [PARENT_TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list[Partition]:
+    """Range partitions of the raw table ordered by start (default excluded)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [PARENT_TABLE],
+        )
+        rows = cursor.fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND_RE.search(bound)
+        if match is None:
+            continue
+        start, end = (datetime.fromisoformat(value) for value in match.groups())
+        partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def _period_start(moment: datetime, interval: str) -> datetime:
+    start = moment.astimezone(dt_timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    if interval == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def _period_end(start: datetime, interval: str) -> datetime:
+    # From an arbitrary start (e.g. after switching interval) to the next boundary
+    return _period_start(start, interval) + timedelta(
+        days=7 if interval == "week" else 1
+    )
+
+
+def create_partitions(start: datetime, until: datetime) -> list[str]:
+    """
+    Create contiguous partitions from the period containing `start` up to `until`.
+
+    Continues from the last existing partition, so partitions never overlap
+    even when ECOWITT_OBSERVATION_PARTITION_INTERVAL changes. A period whose
+    rows already landed in the default partition (the manager did not run in
+    time) is skipped; those rows expire from the default partition. Returns
+    the names of the created partitions.
+    """
+    interval = _get_partition_interval()
+    next_start = _period_start(start, interval)
+    existing = list_partitions()
+    if existing:
+        next_start = max(next_start, existing[-1].end)
+
+    created = []
+    with connection.cursor() as cursor:
+        while next_start < until:
+            next_end = _period_end(next_start, interval)
+            name = f"{PARENT_TABLE}_p{next_start:%Y%m%d}"
+            try:
+                with transaction.atomic():
+                    cursor.execute(
+                        f'CREATE TABLE "{name}" PARTITION OF "{PARENT_TABLE}" '
+                        "FOR VALUES FROM (%s) TO (%s)",
+                        [next_start, next_end],
+                    )
+                created.append(name)
+            except IntegrityError as exc:
+                log.warning("Skipping partition %s: %s", name, exc)
+            next_start = next_end
+    return created
+
+
+def drop_expired_partitions(threshold: datetime) -> list[str]:
+    """Detach and drop partitions whose every row is older than `threshold`."""
+    dropped = []
+    with connection.cursor() as cursor:
+        for partition in list_partitions():
+            if partition.end > threshold:
+                break
+            # Never leave a detached partition behind if the drop fails
+            with transaction.atomic():
+                cursor.execute(
+                    f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{partition.name}"'
+                )
+                cursor.execute(f'DROP TABLE "{partition.name}"')
+            dropped.append(partition.name)
+    return dropped
+
+
+def purge_default_partition(threshold: datetime) -> int:
+    """Delete expired rows that fell outside every range partition."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM "{DEFAULT_PARTITION}" WHERE dateutc < %s', [threshold]
+        )
+        return cursor.rowcount
@@ -52,6 +52,17 @@ def _extract_token_from_headers(
     return parts[-1]
 
 
+def has_valid_service_token(meta: dict) -> bool:
+    """Whether request headers (`request.META`) carry an allowed service token."""
+    token = _extract_token_from_headers(
+        meta.get("HTTP_AUTHORIZATION"), meta.get("HTTP_X_API_KEY")
+    )
+    if not token:
+        return False
+
+    return token in _load_service_tokens()
+
+
 class IsAuthenticatedOrHasServiceToken(BasePermission):
     """Allow if the user is authenticated or presents a valid service token."""
 
@@ -62,12 +73,11 @@ class IsAuthenticatedOrHasServiceToken(BasePermission):
             return True
 
         # Otherwise, verify service token header
-        auth_header = request.META.get("HTTP_AUTHORIZATION")
-        x_api_key = request.META.get("HTTP_X_API_KEY")
+        return has_valid_service_token(request.META)
 
-        token = _extract_token_from_headers(auth_header, x_api_key)
-        if not token:
-            return False
 
-        allowed_tokens = _load_service_tokens()
-        return token in allowed_tokens
+class HasServiceToken(BasePermission):
+    """Allow requests presenting a valid service token."""
+
+    def has_permission(self, request, view) -> bool:
+        return has_valid_service_token(request.META)
@@ -1,6 +1,20 @@
+import re
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import ProhibitNullCharactersValidator
+from django.db import connection, models
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework.utils import humanize_datetime
+from rest_framework.validators import ProhibitSurrogateCharactersValidator
 
-from .models import EcowittObservation, EcowittObservation5Min
+from .models import (
+    EcowittObservation,
+    EcowittObservation1Day,
+    EcowittObservation1Hour,
+    EcowittObservation5Min,
+)
 
 
 class EcowittObservationSerializer(serializers.ModelSerializer):
@@ -74,3 +88,207 @@ class EcowittObservation5MinSerializer(serializers.ModelSerializer):
             "yearlyrainin_last",
             "totalrainin_last",
         ]
+
+
+class EcowittObservation1HourSerializer(EcowittObservation5MinSerializer):
+    class Meta(EcowittObservation5MinSerializer.Meta):
+        model = EcowittObservation1Hour
+
+
+class EcowittObservation1DaySerializer(EcowittObservation5MinSerializer):
+    class Meta(EcowittObservation5MinSerializer.Meta):
+        model = EcowittObservation1Day
+
+
+# Metrics that can be projected in the columnar history layout
+HISTORY_COLUMN_FIELDS = [
+    field
+    for field in EcowittObservation5MinSerializer.Meta.fields
+    if field != "bucket_start"
+]
+
+
+def _format_bucket_start(value) -> str:
+    # Same representation as the DRF DateTimeField (UTC, "Z" suffix)
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def history_columns(rows: list[tuple], fields: list[str]) -> dict:
+    """
+    Build the columnar history payload from `values_list("bucket_start", *fields)`
+    rows: one timestamp array plus one array per metric.
+    """
+    columns = list(zip(*rows)) if rows else [()] * (len(fields) + 1)
+    return {
+        "bucket_start": [_format_bucket_start(value) for value in columns[0]],
+        **{field: list(column) for field, column in zip(fields, columns[1:])},
+    }
+
+
+# ---------------------------------------------------------------------------- #
+#                              LEAN INGEST SCHEMA                              #
+# ---------------------------------------------------------------------------- #
+# Station payloads are parsed by plain per-field functions built once from the
+# model and `EcowittObservationSerializer`: same coercion, limits and error
+# messages as the serializer, without its per-request field machinery.
+
+_MISSING = object()
+_FIELD_MESSAGES = serializers.Field.default_error_messages
+_MAX_STRING_LENGTH = 1000  # DRF's guard against huge numeric strings
+_INTEGER_DECIMAL_RE = re.compile(r"\.0*\s*$")  # '1.0' is an integer, '1.2' not
+_STATION_DATEUTC_RE = re.compile(
+    r"([0-9]{4})-([0-9]{2})-([0-9]{2}) ([0-9]{2}):([0-9]{2}):([0-9]{2})"
+)
+_CHAR_VALIDATORS = (
+    ProhibitNullCharactersValidator(),
+    ProhibitSurrogateCharactersValidator(),
+)
+
+
+def _char_parser(max_length: int):
+    messages = serializers.CharField.default_error_messages
+    too_long = messages["max_length"].format(max_length=max_length)
+
+    def parse(data) -> str:
+        if isinstance(data, bool) or not isinstance(data, (str, int, float)):
+            raise serializers.ValidationError(messages["invalid"])
+        value = str(data).strip()
+        if not value:
+            raise serializers.ValidationError(messages["blank"])
+        errors = [too_long] if len(value) > max_length else []
+        for validator in _CHAR_VALIDATORS:
+            try:
+                validator(value)
+            except DjangoValidationError as exc:
+                errors.extend(exc.messages)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+    return parse
+
+
+def _integer_parser(min_value: int, max_value: int):
+    messages = serializers.IntegerField.default_error_messages
+    too_small = messages["min_value"].format(min_value=min_value)
+    too_large = messages["max_value"].format(max_value=max_value)
+
+    def parse(data) -> int:
+        if isinstance(data, str) and len(data) > _MAX_STRING_LENGTH:
+            raise serializers.ValidationError(messages["max_string_length"])
+        try:
+            value = int(_INTEGER_DECIMAL_RE.sub("", str(data)))
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(messages["invalid"])
+        if value < min_value:
+            raise serializers.ValidationError(too_small)
+        if value > max_value:
+            raise serializers.ValidationError(too_large)
+        return value
+
+    return parse
+
+
+def _float_parser():
+    messages = serializers.FloatField.default_error_messages
+
+    def parse(data) -> float:
+        if isinstance(data, str) and len(data) > _MAX_STRING_LENGTH:
+            raise serializers.ValidationError(messages["max_string_length"])
+        try:
+            return float(data)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError(messages["invalid"])
+        except OverflowError:
+            raise serializers.ValidationError(messages["overflow"])
+
+    return parse
+
+
+def _datetime_parser(input_formats: list[str]):
+    invalid = serializers.DateTimeField.default_error_messages["invalid"].format(
+        format=humanize_datetime.datetime_formats(input_formats)
+    )
+
+    def parse(data) -> datetime:
+        # Fast path for the format stations send ("YYYY-MM-DD hh:mm:ss")
+        if isinstance(data, str):
+            match = _STATION_DATEUTC_RE.fullmatch(data)
+            if match is not None:
+                try:
+                    return timezone.make_aware(datetime(*map(int, match.groups())))
+                except ValueError:
+                    pass
+        for input_format in input_formats:
+            try:
+                parsed = datetime.strptime(data, input_format)
+            except (TypeError, ValueError):
+                continue
+            if timezone.is_aware(parsed):
+                return timezone.localtime(parsed)
+            return timezone.make_aware(parsed)
+        raise serializers.ValidationError(invalid)
+
+    return parse
+
+
+def _build_ingest_schema() -> tuple:
+    declared = EcowittObservationSerializer._declared_fields
+    schema = []
+    for name in EcowittObservationSerializer.Meta.fields:
+        field = EcowittObservation._meta.get_field(name)
+        if name in declared:
+            parse = _datetime_parser(declared[name].input_formats)
+        elif isinstance(field, models.CharField):
+            parse = _char_parser(field.max_length)
+        elif isinstance(field, models.IntegerField):
+            parse = _integer_parser(
+                *connection.ops.integer_field_range(field.get_internal_type())
+            )
+        elif isinstance(field, models.FloatField):
+            parse = _float_parser()
+        else:  # pragma: no cover - guards future model changes
+            raise TypeError(f"No ingest parser for {name} ({type(field).__name__})")
+        schema.append((name, parse))
+    return tuple(schema)
+
+
+INGEST_SCHEMA = _build_ingest_schema()
+
+
+def parse_observation(data) -> tuple[dict, dict]:
+    """
+    Validate and coerce a station payload in one pass over INGEST_SCHEMA.
+
+    `data` is a QueryDict or a dict (list values use their first item).
+    Returns `(values, errors)`: the model field values, and the errors in the
+    same shape as `EcowittObservationSerializer(data=data).errors`.
+    """
+    values = {}
+    errors = {}
+    for name, parse in INGEST_SCHEMA:
+        raw_value = data.get(name, _MISSING)
+        if isinstance(raw_value, list):
+            raw_value = raw_value[0] if raw_value else _MISSING
+        if raw_value is _MISSING:
+            errors[name] = serializers.ValidationError(
+                _FIELD_MESSAGES["required"], code="required"
+            ).detail
+        elif raw_value is None:
+            errors[name] = serializers.ValidationError(
+                _FIELD_MESSAGES["null"], code="null"
+            ).detail
+        else:
+            try:
+                values[name] = parse(raw_value)
+            except serializers.ValidationError as exc:
+                errors[name] = exc.detail
+    return values, errors
+
+
+def observation_representation(values: dict) -> dict:
+    """Parsed observation as `EcowittObservationSerializer` would render it."""
+    dateutc = timezone.localtime(values["dateutc"]).isoformat()
+    if dateutc.endswith("+00:00"):
+        dateutc = dateutc[:-6] + "Z"
+    return {**values, "dateutc": dateutc}
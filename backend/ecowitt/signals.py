@@ -3,6 +3,8 @@ import logging
 from django.db.models.signals import post_migrate
 from django.dispatch import receiver
 
+from .buffer import get_ingest_mode
+
 
 log = logging.getLogger(__name__)
 
@@ -43,18 +45,70 @@ def create_ecowitt_purge_schedule(sender, app_config=None, **kwargs):
             defaults={"enabled": True},
         )
 
-        # Ensure 2-minute aggregation schedule exists
+        # Hourly partition maintenance (creation ahead, retention by dropping)
+        hourly, _ = CrontabSchedule.objects.get_or_create(
+            minute="15",
+            hour="*",
+            day_of_week="*",
+            day_of_month="*",
+            month_of_year="*",
+        )
+        PeriodicTask.objects.get_or_create(
+            crontab=hourly,
+            name="Manage Ecowitt raw observation partitions (hourly)",
+            task="ecowitt.tasks.manage_observation_partitions",
+            defaults={"enabled": True},
+        )
+
+        # Buckets are finalized on ingest; aggregation only reconciles every 10m
         from django_celery_beat.models import IntervalSchedule
 
         interval, _ = IntervalSchedule.objects.get_or_create(
-            every=2, period=IntervalSchedule.MINUTES
+            every=10, period=IntervalSchedule.MINUTES
         )
         agg_task_name = "ecowitt.tasks.aggregate_observations_5min"
+        agg_name = "Reconcile Ecowitt 5-minute aggregates (every 10m)"
+        # Replaces the former 2-minute polling schedule, keeping its enabled flag
+        if not PeriodicTask.objects.filter(name=agg_name).exists():
+            PeriodicTask.objects.filter(
+                name="Aggregate Ecowitt observations into 5-minute buckets (every 2m)"
+            ).update(name=agg_name)
+        PeriodicTask.objects.update_or_create(
+            name=agg_name,
+            defaults={"task": agg_task_name, "interval": interval},
+            create_defaults={
+                "task": agg_task_name,
+                "interval": interval,
+                "enabled": True,
+            },
+        )
+
+        every_minute, _ = IntervalSchedule.objects.get_or_create(
+            every=1, period=IntervalSchedule.MINUTES
+        )
+        # Safety net for buffered ingest; flushes are scheduled on ingest
+        flush_name = "Flush buffered Ecowitt observations (every 1m)"
+        if get_ingest_mode() == "buffered":
+            PeriodicTask.objects.update_or_create(
+                name=flush_name,
+                defaults={
+                    "interval": every_minute,
+                    "task": "ecowitt.tasks.flush_ingest_buffer",
+                    "enabled": True,
+                },
+            )
+        else:
+            # Left over from buffered mode: nothing is buffered any more
+            PeriodicTask.objects.filter(name=flush_name).update(enabled=False)
+        # Safety net for the disk spool, which sync writes fall back to in
+        # either mode; replays are scheduled on spooling
         PeriodicTask.objects.get_or_create(
-            interval=interval,
-            name="Aggregate Ecowitt observations into 5-minute buckets (every 2m)",
-            task=agg_task_name,
-            defaults={"enabled": True},
+            name="Replay spooled Ecowitt observations (every 1m)",
+            defaults={
+                "interval": every_minute,
+                "task": "ecowitt.tasks.replay_ingest_spool",
+                "enabled": True,
+            },
         )
     except Exception as exc:  # pragma: no cover - defensive
         # Do not crash migrations for scheduling errors
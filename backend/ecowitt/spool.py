@@ -0,0 +1,200 @@
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from . import metrics
+from .buffer import decode_observation
+from .models import EcowittObservation
+
+
+log = logging.getLogger(__name__)
+
+# Appended to by ingest; renamed to REPLAY_FILE while the replayer inserts it
+SPOOL_FILE = "observations.ndjson"
+REPLAY_FILE = "observations.replaying.ndjson"
+LOCK_FILE = ".lock"
+# Number of spooled entries, kept up to date under the lock
+DEPTH_FILE = ".depth"
+
+SPOOL_DEPTH = metrics.Gauge(
+    "ingest_spool_depth",
+    "Observations waiting in the local disk spool for the database",
+)
+OBSERVATIONS_SPOOLED = metrics.Counter(
+    "ingest_observations_spooled",
+    "Observations written to the local disk spool instead of the database",
+)
+OBSERVATIONS_REPLAYED = metrics.Counter(
+    "ingest_observations_replayed",
+    "Spooled observations inserted once the database was healthy again",
+)
+
+
+def _get_spool_dir() -> Path:
+    raw_value = os.getenv("ECOWITT_SPOOL_DIR", "")
+    if not raw_value:
+        # Default to the media volume, which survives container restarts
+        return Path(settings.MEDIA_ROOT) / "ecowitt-spool"
+    return Path(raw_value)
+
+
+def _get_write_timeout_ms() -> int:
+    raw_value = os.getenv("ECOWITT_INGEST_WRITE_TIMEOUT_MS", "")
+    if not raw_value:
+        # Default to spooling any observation whose INSERT takes over 2 seconds
+        return 2000
+    try:
+        return max(int(raw_value), 0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_INGEST_WRITE_TIMEOUT_MS='%s'. Falling back to 2000.",
+            raw_value,
+        )
+        return 2000
+
+
+def get_replay_delay_seconds() -> int:
+    raw_value = os.getenv("ECOWITT_SPOOL_REPLAY_DELAY_SECONDS", "")
+    if not raw_value:
+        # Default to giving the database 30 seconds before the first replay
+        return 30
+    try:
+        return max(int(raw_value), 0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_SPOOL_REPLAY_DELAY_SECONDS='%s'. Falling back to 30.",
+            raw_value,
+        )
+        return 30
+
+
+@contextmanager
+def bounded_write():
+    """
+    Transaction whose statements are cancelled after ECOWITT_INGEST_WRITE_TIMEOUT_MS.
+
+    A cancelled statement raises OperationalError, like an unreachable
+    database, so the caller spools the observation either way.
+    """
+    with transaction.atomic():
+        timeout_ms = _get_write_timeout_ms()
+        if timeout_ms:
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", [timeout_ms])
+        yield
+
+
+@contextmanager
+def _locked():
+    # Serializes appends and rotation across worker processes
+    directory = _get_spool_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield directory
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def has_pending() -> bool:
+    """Whether spooled observations still wait for the database.
+
+    While they do, new observations are spooled too, so they are inserted
+    after the older ones.
+    """
+    directory = _get_spool_dir()
+    return (directory / SPOOL_FILE).exists() or (directory / REPLAY_FILE).exists()
+
+
+def _read_depth(directory: Path) -> int:
+    try:
+        return max(int((directory / DEPTH_FILE).read_text()), 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_depth(directory: Path, depth: int) -> int:
+    depth = max(depth, 0)
+    (directory / DEPTH_FILE).write_text(str(depth))
+    SPOOL_DEPTH.set(depth)
+    return depth
+
+
+def spool_observation(values: dict) -> bool:
+    """
+    Durably append validated observation fields to the spool.
+
+    Returns True when the entry started a new spool file, i.e. a replay needs
+    to be scheduled.
+    """
+    line = (json.dumps(values, cls=DjangoJSONEncoder) + "\n").encode()
+    with _locked() as directory:
+        path = directory / SPOOL_FILE
+        started = not path.exists()
+        with open(path, "a+b") as handle:
+            if handle.seek(0, os.SEEK_END):
+                # Never glue an entry onto a line torn by a crash mid-append
+                handle.seek(-1, os.SEEK_END)
+                if handle.read(1) != b"\n":
+                    line = b"\n" + line
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+        _write_depth(directory, _read_depth(directory) + 1)
+    OBSERVATIONS_SPOOLED.inc()
+    return started
+
+
+def _read(path: Path) -> tuple[list[EcowittObservation], int]:
+    """Observations of a spool file, and its number of entries."""
+    with open(path, encoding="utf-8") as handle:
+        # A torn last line (crash mid-append) is logged and skipped
+        observations = [decode_observation(line) for line in handle if line.strip()]
+    return (
+        [observation for observation in observations if observation is not None],
+        len(observations),
+    )
+
+
+def replay_spool(on_replayed=None) -> int:
+    """
+    Insert spooled observations in the order they were spooled.
+
+    The spool file is renamed before being read, so ingest keeps appending to
+    a fresh one meanwhile; those entries are replayed on the next pass. A
+    replay file is deleted only after its rows have committed, and a failed
+    replay (database still down) leaves it to be retried first next time.
+    Observations whose dateutc is already stored are skipped. `on_replayed` is
+    called with each committed file's inserted observations. Returns the
+    number of rows inserted.
+    """
+    replayed_count = 0
+    while True:
+        with _locked() as directory:
+            replaying = directory / REPLAY_FILE
+            if not replaying.exists():
+                if not (directory / SPOOL_FILE).exists():
+                    _write_depth(directory, 0)
+                    return replayed_count
+                os.replace(directory / SPOOL_FILE, replaying)
+
+        observations, entries = _read(replaying)
+        with transaction.atomic():
+            observations = EcowittObservation.objects.insert_new(observations)
+        with _locked() as directory:
+            replaying.unlink()
+            _write_depth(directory, _read_depth(directory) - entries)
+
+        replayed_count += len(observations)
+        OBSERVATIONS_REPLAYED.inc(len(observations))
+        log.info("Replayed %s spooled Ecowitt observations", len(observations))
+        if on_replayed is not None:
+            on_replayed(observations)
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import os
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .cache import get_latest_observation
+
+
+log = logging.getLogger(__name__)
+
+OBSERVATIONS_CHANNEL = "ecowitt:observations"
+
+
+def _get_heartbeat_seconds() -> int:
+    raw_value = os.getenv("ECOWITT_STREAM_HEARTBEAT_SECONDS", "")
+    if not raw_value:
+        # Default to a comment every 15 seconds to keep proxies from timing out
+        return 15
+    try:
+        return max(int(raw_value), 1)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_STREAM_HEARTBEAT_SECONDS='%s'. Falling back to 15.",
+            raw_value,
+        )
+        return 15
+
+
+_redis_client: redis.Redis | None = None
+
+
+def publish_observation(data: dict) -> None:
+    """Publish a serialized observation to every stream subscriber (all processes)."""
+    global _redis_client
+    try:
+        if _redis_client is None:
+            _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+        _redis_client.publish(OBSERVATIONS_CHANNEL, json.dumps(data))
+    except Exception as exc:
+        log.warning("Failed to publish observation to stream: %s", exc)
+
+
+class ObservationBroadcaster:
+    """
+    Fans out one Redis pub/sub subscription to every subscriber of this process.
+
+    Each subscriber owns a small bounded queue, so an idle connection costs a
+    queue and a suspended generator rather than a Redis connection. Slow
+    consumers drop their oldest pending message instead of growing unbounded.
+    """
+
+    def __init__(self, channel: str = OBSERVATIONS_CHANNEL, queue_size: int = 8):
+        self.channel = channel
+        self.queue_size = queue_size
+        self.subscribers: set[asyncio.Queue] = set()
+        self._listener: asyncio.Task | None = None
+
+    def add(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        self._ensure_listener()
+        return queue
+
+    def remove(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def broadcast(self, message: str) -> None:
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    def _ensure_listener(self) -> None:
+        loop = asyncio.get_running_loop()
+        if (
+            self._listener is None
+            or self._listener.done()
+            or self._listener.get_loop() is not loop
+        ):
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        # Keep the subscription only while this process has subscribers
+        while self.subscribers:
+            client = aioredis.Redis.from_url(settings.REDIS_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                while self.subscribers:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.broadcast(message["data"].decode())
+            except Exception as exc:
+                log.warning("Observation stream subscription failed: %s", exc)
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+broadcaster = ObservationBroadcaster()
+
+
+def format_event(data: str, event: str = "observation") -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def observation_events(
+    source: ObservationBroadcaster = broadcaster, heartbeat: int | None = None
+):
+    """Server-Sent Events for newly ingested observations.
+
+    Starts with the latest cached observation so clients render immediately,
+    then emits one event per ingest and a comment line as a keep-alive.
+    """
+    heartbeat = heartbeat or _get_heartbeat_seconds()
+    queue = source.add()
+    try:
+        yield "retry: 5000\n\n"
+        latest = await sync_to_async(get_latest_observation)()
+        if latest is not None:
+            yield format_event(json.dumps(latest))
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(message)
+    finally:
+        source.remove(queue)
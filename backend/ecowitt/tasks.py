@@ -1,15 +1,57 @@
+import functools
 import logging
 import os
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable
 
 from celery import shared_task
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import DatabaseError, connection, transaction
+from django.db.models import (
+    Avg,
+    Count,
+    DateTimeField,
+    F,
+    FloatField,
+    Func,
+    Max,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Trunc
 from django.utils import timezone
 
-from .models import EcowittObservation, EcowittObservation5Min
+from . import archive, buffer, metrics, partitions, spool
+from .locks import renew_lease, single_flight
+from .cache import (
+    MADRID_TZ,
+    bump_history_generation,
+    bump_history_versions,
+    madrid_days,
+)
+from .models import (
+    EcowittDirtyBucket,
+    EcowittObservation,
+    EcowittObservation1Day,
+    EcowittObservation1Hour,
+    EcowittObservation5Min,
+    EcowittOpenBucket,
+)
 
 
 log = logging.getLogger(__name__)
 
+PURGE_ROWS_DELETED = metrics.Counter(
+    "purge_rows_deleted",
+    "Rows deleted by the retention purge, updated after every batch",
+)
+LATE_ROWS_ABSORBED = metrics.Counter(
+    "aggregate_late_rows_absorbed",
+    "Observations that arrived after their 5-minute bucket had been aggregated",
+)
+
 
 def _get_observation_retention_days() -> int:
     raw_value = os.getenv("ECOWITT_OBSERVATION_RETENTION_DAYS", "")
@@ -47,50 +89,176 @@ def _get_aggregate_retention_days() -> int:
         return 30
 
 
+def _get_hourly_retention_days() -> int:
+    raw_value = os.getenv("ECOWITT_HOURLY_RETENTION_DAYS", "")
+    if not raw_value:
+        # Default to 1 year if not provided
+        return 365
+    try:
+        value = int(raw_value)
+        # Guard against negative or zero values
+        return max(value, 1)
+    except ValueError:
+        # Fallback to sane default and warn
+        log.warning(
+            "Invalid ECOWITT_HOURLY_RETENTION_DAYS='%s'. Falling back to 365.",
+            raw_value,
+        )
+        return 365
+
+
+def _get_daily_retention_days() -> int:
+    raw_value = os.getenv("ECOWITT_DAILY_RETENTION_DAYS", "")
+    if not raw_value:
+        # Default to 10 years if not provided
+        return 3650
+    try:
+        value = int(raw_value)
+        # Guard against negative or zero values
+        return max(value, 1)
+    except ValueError:
+        # Fallback to sane default and warn
+        log.warning(
+            "Invalid ECOWITT_DAILY_RETENTION_DAYS='%s'. Falling back to 3650.",
+            raw_value,
+        )
+        return 3650
+
+
+def _get_purge_batch_size() -> int:
+    raw_value = os.getenv("ECOWITT_PURGE_BATCH_SIZE", "")
+    if not raw_value:
+        # Default to 5000 rows per batch; 0 deletes each table in one statement
+        return 5000
+    try:
+        return max(int(raw_value), 0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_PURGE_BATCH_SIZE='%s'. Falling back to 5000.", raw_value
+        )
+        return 5000
+
+
+def _get_purge_batch_pause_seconds() -> float:
+    raw_value = os.getenv("ECOWITT_PURGE_BATCH_PAUSE_SECONDS", "")
+    if not raw_value:
+        # Default to a short pause so vacuum and replicas keep up between batches
+        return 0.1
+    try:
+        return max(float(raw_value), 0.0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_PURGE_BATCH_PAUSE_SECONDS='%s'. Falling back to 0.1.",
+            raw_value,
+        )
+        return 0.1
+
+
+def _purge(queryset, heartbeat: Callable[[], None] | None = None) -> int:
+    """
+    Delete the rows of `queryset` in primary-key batches.
+
+    Each batch selects the next ECOWITT_PURGE_BATCH_SIZE primary keys (keyset
+    pagination, no model instances) and deletes them in its own short
+    statement, pausing ECOWITT_PURGE_BATCH_PAUSE_SECONDS in between. Nothing
+    spans batches, so a killed run leaves only fully deleted batches behind
+    and the next run simply continues. `heartbeat` is called after every
+    batch (e.g. to renew the task's lease). Returns the number of deleted rows.
+    """
+    batch_size = _get_purge_batch_size()
+    if not batch_size:
+        deleted_count, _ = queryset.delete()
+        return deleted_count
+
+    pause_seconds = _get_purge_batch_pause_seconds()
+    model = queryset.model
+    deleted_count = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not pks:
+            break
+        batch_deleted, _ = model.objects.filter(pk__in=pks).delete()
+        deleted_count += batch_deleted
+        PURGE_ROWS_DELETED.inc(batch_deleted)
+        log.info("Purging %s: %s rows deleted so far", model.__name__, deleted_count)
+        if heartbeat is not None:
+            heartbeat()
+        if len(pks) < batch_size:
+            break
+        last_pk = pks[-1]
+        time.sleep(pause_seconds)
+    return deleted_count
+
+
 @shared_task
-def purge_old_observations() -> int:
+@single_flight("aggregation")
+def purge_old_observations() -> int | None:
     """
-    Delete raw observations and aggregated 5-minute buckets based on retention envs.
+    Delete raw observations, aggregated 5-minute buckets and hourly/daily rollups
+    based on retention envs.
+
+    Expired rows are first exported to the cold archive (see
+    `archive.archive_expired`); if that fails, the task fails before deleting
+    anything. Rows are then deleted in bounded primary-key batches (see
+    `_purge`), so a large backlog never turns into one long transaction and an
+    interrupted purge is picked up by the next run.
+
+    Shares the `aggregation` lock with the aggregation tasks, so it never
+    overlaps them; a call made while the lock is held returns None and runs
+    right after the holder.
 
     Returns the number of deleted rows.
     """
     obs_retention_days = _get_observation_retention_days()
     agg_retention_days = _get_aggregate_retention_days()
+    heartbeat = functools.partial(renew_lease, "aggregation")
 
     now = timezone.now()
 
-    # Purge raw observations
+    # Purge raw observations, unless whole partitions are dropped instead
     obs_threshold = now - timedelta(days=obs_retention_days)
-    obs_deleted_count, _ = EcowittObservation.objects.filter(
-        dateutc__lt=obs_threshold
-    ).delete()
-
-    if obs_deleted_count == 0:
-        # As a safety net, also attempt via created_at for any edge cases
-        obs_alt_deleted_count, _ = EcowittObservation.objects.filter(
-            created_at__lt=obs_threshold
-        ).delete()
-        obs_deleted_count += obs_alt_deleted_count
+    obs_deleted_count = 0
+    if partitions.is_partitioned():
+        log.info("Raw observation retention is enforced by dropping partitions")
+    else:
+        archive.archive_expired(EcowittObservation, obs_threshold, heartbeat)
+        obs_deleted_count = _purge(
+            EcowittObservation.objects.filter(dateutc__lt=obs_threshold), heartbeat
+        )
 
-    log.info(
-        "Purged %s Ecowitt raw observations older than %s days (threshold=%s)",
-        obs_deleted_count,
-        obs_retention_days,
-        obs_threshold.isoformat(),
-    )
+        if obs_deleted_count == 0:
+            # As a safety net, also attempt via created_at for any edge cases
+            obs_deleted_count += _purge(
+                EcowittObservation.objects.filter(created_at__lt=obs_threshold),
+                heartbeat,
+            )
+
+        log.info(
+            "Purged %s Ecowitt raw observations older than %s days (threshold=%s)",
+            obs_deleted_count,
+            obs_retention_days,
+            obs_threshold.isoformat(),
+        )
 
     # Purge aggregated 5-minute buckets
     agg_threshold = now - timedelta(days=agg_retention_days)
-    agg_deleted_count, _ = EcowittObservation5Min.objects.filter(
-        bucket_start__lt=agg_threshold
-    ).delete()
+    archive.archive_expired(EcowittObservation5Min, agg_threshold, heartbeat)
+    agg_deleted_count = _purge(
+        EcowittObservation5Min.objects.filter(bucket_start__lt=agg_threshold),
+        heartbeat,
+    )
 
     if agg_deleted_count == 0:
         # Safety net via created_at as well
-        agg_alt_deleted_count, _ = EcowittObservation5Min.objects.filter(
-            created_at__lt=agg_threshold
-        ).delete()
-        agg_deleted_count += agg_alt_deleted_count
+        agg_deleted_count += _purge(
+            EcowittObservation5Min.objects.filter(created_at__lt=agg_threshold),
+            heartbeat,
+        )
 
     log.info(
         "Purged %s Ecowitt 5-minute aggregates older than %s days (threshold=%s)",
@@ -99,7 +267,68 @@ def purge_old_observations() -> int:
         agg_threshold.isoformat(),
     )
 
-    return obs_deleted_count + agg_deleted_count
+    # Purge rollup tiers, each with its own retention
+    rollup_deleted_count = 0
+    for model, retention_days in (
+        (EcowittObservation1Hour, _get_hourly_retention_days()),
+        (EcowittObservation1Day, _get_daily_retention_days()),
+    ):
+        threshold = now - timedelta(days=retention_days)
+        archive.archive_expired(model, threshold, heartbeat)
+        deleted_count = _purge(
+            model.objects.filter(bucket_start__lt=threshold), heartbeat
+        )
+        log.info(
+            "Purged %s %s rows older than %s days (threshold=%s)",
+            deleted_count,
+            model.__name__,
+            retention_days,
+            threshold.isoformat(),
+        )
+        rollup_deleted_count += deleted_count
+
+    if agg_deleted_count or rollup_deleted_count:
+        bump_history_generation()
+
+    return obs_deleted_count + agg_deleted_count + rollup_deleted_count
+
+
+@shared_task
+@single_flight("aggregation")
+def manage_observation_partitions() -> int | None:
+    """
+    Maintain the daily (or weekly) partitions of the raw observations table.
+
+    Creates partitions PARTITION_PREMAKE_DAYS ahead of now and enforces
+    ECOWITT_OBSERVATION_RETENTION_DAYS by detaching and dropping partitions
+    that only hold expired rows, plus deleting expired stragglers from the
+    default partition. Expired rows are exported to the cold archive first.
+    Returns the number of partitions dropped.
+    """
+    if not partitions.is_partitioned():
+        log.info("Raw observations are not partitioned; nothing to manage")
+        return 0
+
+    now = timezone.now()
+    created = partitions.create_partitions(
+        now, now + timedelta(days=partitions.PARTITION_PREMAKE_DAYS)
+    )
+    threshold = now - timedelta(days=_get_observation_retention_days())
+    archive.archive_expired(
+        EcowittObservation, threshold, functools.partial(renew_lease, "aggregation")
+    )
+    dropped = partitions.drop_expired_partitions(threshold)
+    default_deleted_count = partitions.purge_default_partition(threshold)
+
+    log.info(
+        "Created %s and dropped %s raw observation partitions; purged %s rows "
+        "from the default partition (threshold=%s)",
+        len(created),
+        len(dropped),
+        default_deleted_count,
+        threshold.isoformat(),
+    )
+    return len(dropped)
 
 
 def _floor_to_5_minutes(dt):
@@ -108,38 +337,123 @@ def _floor_to_5_minutes(dt):
     return dt.replace(minute=minute, second=0, microsecond=0)
 
 
-@shared_task
-def aggregate_observations_5min() -> int:
-    """
-    Aggregate raw observations into 5-minute buckets aligned at :00, :05, :10, ...
+def _get_catchup_threshold_buckets() -> int:
+    raw_value = os.getenv("ECOWITT_AGGREGATE_CATCHUP_BUCKETS", "")
+    if not raw_value:
+        # Default to switching to catch-up mode when more than 6 buckets are pending
+        return 6
+    try:
+        value = int(raw_value)
+        # Guard against negative values
+        return max(value, 0)
+    except ValueError:
+        # Fallback to sane default and warn
+        log.warning(
+            "Invalid ECOWITT_AGGREGATE_CATCHUP_BUCKETS='%s'. Falling back to 6.",
+            raw_value,
+        )
+        return 6
 
-    Strategy:
-    - Determine the most recent completed bucket end (now floored to 5m).
-    - Find the last aggregated bucket_start; aggregate any missing buckets up to latest completed.
-    - For each bucket, compute averages and maxima, and upsert into EcowittObservation5Min.
 
-    Returns number of buckets aggregated.
-    """
-    now = timezone.now()
-    latest_completed_end = _floor_to_5_minutes(now)
+def _get_finalize_delay_seconds() -> int:
+    raw_value = os.getenv("ECOWITT_AGGREGATE_FINALIZE_DELAY_SECONDS", "")
+    if not raw_value:
+        # Default to finalizing a bucket 5 seconds after it ends
+        return 5
+    try:
+        return max(int(raw_value), 0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_AGGREGATE_FINALIZE_DELAY_SECONDS='%s'. Falling back to 5.",
+            raw_value,
+        )
+        return 5
+
+
+# Fields whose bucket value is the last observed value (cumulative counters)
+CUMULATIVE_FIELDS = (
+    "eventrainin",
+    "hourlyrainin",
+    "dailyrainin",
+    "weeklyrainin",
+    "monthlyrainin",
+    "yearlyrainin",
+    "totalrainin",
+)
+
+# Every aggregate column of EcowittObservation5Min except the bucket key itself
+AGGREGATE_FIELDS = (
+    "sample_count",
+    "tempinf_avg",
+    "humidityin_avg",
+    "baromrelin_avg",
+    "baromabsin_avg",
+    "tempf_avg",
+    "humidity_avg",
+    "winddir_avg",
+    "windspeedmph_avg",
+    "windgustmph_max",
+    "maxdailygust_max",
+    "solarradiation_avg",
+    "uv_avg",
+    "rainratein_avg",
+    *(f"{field}_last" for field in CUMULATIVE_FIELDS),
+)
+
+
+def _bucket_stats_aggregates() -> dict:
+    """Averages and maxima computed for every 5-minute bucket."""
+    return {
+        "tempinf_avg": Avg("tempinf"),
+        "humidityin_avg": Avg("humidityin"),
+        "baromrelin_avg": Avg("baromrelin"),
+        "baromabsin_avg": Avg("baromabsin"),
+        "tempf_avg": Avg("tempf"),
+        "humidity_avg": Avg("humidity"),
+        "winddir_avg": Avg("winddir"),
+        "windspeedmph_avg": Avg("windspeedmph"),
+        "windgustmph_max": Max("windgustmph"),
+        "maxdailygust_max": Max("maxdailygust"),
+        "solarradiation_avg": Avg("solarradiation"),
+        "uv_avg": Avg("uv"),
+        "rainratein_avg": Avg("rainratein"),
+    }
+
+
+class _FiveMinuteBin(Func):
+    """Postgres `date_bin` aligned to the same :00, :05, :10 ... UTC boundaries
+    as `_floor_to_5_minutes`."""
+
+    function = "date_bin"
+    output_field = DateTimeField()
+
+    def __init__(self, expression, **extra):
+        super().__init__(
+            Value(timedelta(minutes=5)),
+            expression,
+            Value(datetime(2000, 1, 1, tzinfo=dt_timezone.utc)),
+            **extra,
+        )
 
-    # Identify where to start based on last aggregated bucket
-    last_agg = EcowittObservation5Min.objects.order_by("-bucket_start").first()
-    if last_agg is not None:
-        start_time = last_agg.bucket_start + timedelta(minutes=5)
-    else:
-        # If no aggregations exist, start from the earliest observation floored
-        first_obs = EcowittObservation.objects.order_by("dateutc", "created_at").first()
-        if first_obs is None:
-            return 0
-        start_time = _floor_to_5_minutes(first_obs.dateutc)
 
-    if start_time >= latest_completed_end:
-        return 0
+def _last_value(field: str, ordering=("-dateutc", "-created_at")) -> Func:
+    """Last value of `field` within a group, ordered like the per-bucket path."""
+    return Func(
+        ArrayAgg(field, ordering=ordering),
+        template="(%(expressions)s)[1]",
+        output_field=FloatField(),
+    )
+
+
+def _aggregate_buckets_per_bucket(start_time, end_time) -> int:
+    """
+    Aggregate [start_time, end_time) one bucket at a time.
 
-    aggregated = 0
+    Cheap when only a couple of buckets are pending, which is the steady state.
+    """
+    aggregated_buckets = []
     bucket_start = start_time
-    while bucket_start < latest_completed_end:
+    while bucket_start < end_time:
         bucket_end = bucket_start + timedelta(minutes=5)
         qs = EcowittObservation.objects.filter(
             dateutc__gte=bucket_start, dateutc__lt=bucket_end
@@ -150,23 +464,7 @@ def aggregate_observations_5min() -> int:
             continue
 
         # Compute aggregates
-        from django.db.models import Avg, Max
-
-        stats = qs.aggregate(
-            tempinf_avg=Avg("tempinf"),
-            humidityin_avg=Avg("humidityin"),
-            baromrelin_avg=Avg("baromrelin"),
-            baromabsin_avg=Avg("baromabsin"),
-            tempf_avg=Avg("tempf"),
-            humidity_avg=Avg("humidity"),
-            winddir_avg=Avg("winddir"),
-            windspeedmph_avg=Avg("windspeedmph"),
-            windgustmph_max=Max("windgustmph"),
-            maxdailygust_max=Max("maxdailygust"),
-            solarradiation_avg=Avg("solarradiation"),
-            uv_avg=Avg("uv"),
-            rainratein_avg=Avg("rainratein"),
-        )
+        stats = qs.aggregate(**_bucket_stats_aggregates())
 
         # For cumulative-like fields, take the last value within the bucket by dateutc/created_at
         last = qs.order_by("-dateutc", "-created_at").first()
@@ -176,20 +474,501 @@ def aggregate_observations_5min() -> int:
             defaults={
                 "sample_count": qs.count(),
                 **stats,
-                "eventrainin_last": last.eventrainin,
-                "hourlyrainin_last": last.hourlyrainin,
-                "dailyrainin_last": last.dailyrainin,
-                "weeklyrainin_last": last.weeklyrainin,
-                "monthlyrainin_last": last.monthlyrainin,
-                "yearlyrainin_last": last.yearlyrainin,
-                "totalrainin_last": last.totalrainin,
+                **{
+                    f"{field}_last": getattr(last, field)
+                    for field in CUMULATIVE_FIELDS
+                },
             },
         )
 
-        aggregated += 1
+        aggregated_buckets.append(bucket_start)
         bucket_start = bucket_end
 
+    rollup_buckets(aggregated_buckets)
+    bump_history_versions(madrid_days(aggregated_buckets))
+    return len(aggregated_buckets)
+
+
+def _aggregate_buckets_set_based(start_time, end_time) -> int:
+    """
+    Aggregate [start_time, end_time) with one grouped query and one bulk upsert.
+
+    Produces the same rows as `_aggregate_buckets_per_bucket` but in two round
+    trips regardless of how many buckets are pending (e.g. after an outage).
+    """
+    buckets = _upsert_buckets(Q(dateutc__gte=start_time, dateutc__lt=end_time))
+    return len(buckets)
+
+
+def _upsert_buckets(observations: Q) -> list:
+    """Recompute and upsert the 5-minute buckets of the matching observations.
+
+    Refreshes the rollups and history versions of the written buckets and
+    returns them with their new `sample_count`.
+    """
+    rows = (
+        EcowittObservation.objects.filter(observations)
+        .annotate(bucket=_FiveMinuteBin("dateutc"))
+        .values("bucket")
+        .annotate(
+            sample_count=Count("id"),
+            **_bucket_stats_aggregates(),
+            **{f"{field}_last": _last_value(field) for field in CUMULATIVE_FIELDS},
+        )
+        .order_by("bucket")
+    )
+
+    buckets = [
+        EcowittObservation5Min(
+            bucket_start=row["bucket"],
+            **{field: row[field] for field in AGGREGATE_FIELDS},
+        )
+        for row in rows
+    ]
+    if not buckets:
+        return []
+
+    EcowittObservation5Min.objects.bulk_create(
+        buckets,
+        update_conflicts=True,
+        unique_fields=["bucket_start"],
+        update_fields=list(AGGREGATE_FIELDS),
+        batch_size=1000,
+    )
+    bucket_starts = [bucket.bucket_start for bucket in buckets]
+    rollup_buckets(bucket_starts)
+    bump_history_versions(madrid_days(bucket_starts))
+    return buckets
+
+
+def mark_dirty_buckets(bucket_starts: list) -> None:
+    """Flag 5-minute buckets for `aggregate_observations_5min` to recompute."""
+    EcowittDirtyBucket.objects.bulk_create(
+        [
+            EcowittDirtyBucket(bucket_start=bucket_start)
+            for bucket_start in bucket_starts
+        ],
+        update_conflicts=True,
+        unique_fields=["bucket_start"],
+        update_fields=["marked_at"],
+        batch_size=1000,
+    )
+
+
+def mark_dirty_bucket(dateutc) -> None:
+    """Flag the bucket of an observation that arrived after the bucket ended."""
+    mark_dirty_buckets([_floor_to_5_minutes(dateutc)])
+
+
+def _bucket_ranges(bucket_starts: list) -> Q:
+    """Observation filter covering the buckets, merging adjacent ones."""
+    ranges = []
+    for bucket_start in sorted(bucket_starts):
+        bucket_end = bucket_start + timedelta(minutes=5)
+        if ranges and ranges[-1][1] == bucket_start:
+            ranges[-1][1] = bucket_end
+        else:
+            ranges.append([bucket_start, bucket_end])
+
+    observations = Q()
+    for start_time, end_time in ranges:
+        observations |= Q(dateutc__gte=start_time, dateutc__lt=end_time)
+    return observations
+
+
+def _reaggregate_dirty_buckets(before) -> int:
+    """
+    Recompute already aggregated buckets that received late observations.
+
+    Only marked buckets older than `before` (the start of the pending range)
+    are recomputed; newer marks are covered by the regular run. Buckets past
+    the aggregate retention are dropped. Returns the number of late rows
+    absorbed, i.e. the growth of the recomputed buckets' sample counts.
+    """
+    cutoff = timezone.now()
+    marks = EcowittDirtyBucket.objects.filter(marked_at__lte=cutoff)
+    retention_start = cutoff - timedelta(days=_get_aggregate_retention_days())
+    bucket_starts = list(
+        marks.filter(bucket_start__gte=retention_start, bucket_start__lt=before)
+        .order_by("bucket_start")
+        .values_list("bucket_start", flat=True)
+    )
+
+    late_rows = 0
+    if bucket_starts:
+        previous_counts = dict(
+            EcowittObservation5Min.objects.filter(
+                bucket_start__in=bucket_starts
+            ).values_list("bucket_start", "sample_count")
+        )
+        for bucket in _upsert_buckets(_bucket_ranges(bucket_starts)):
+            previous = previous_counts.get(bucket.bucket_start, 0)
+            late_rows += max(bucket.sample_count - previous, 0)
+
+    # Marks refreshed by an ingest during this run survive for the next one
+    marks.delete()
+    return late_rows
+
+
+# Rollup columns grouped by how they combine across buckets
+ROLLUP_AVG_FIELDS = [field for field in AGGREGATE_FIELDS if field.endswith("_avg")]
+ROLLUP_MAX_FIELDS = [field for field in AGGREGATE_FIELDS if field.endswith("_max")]
+ROLLUP_LAST_FIELDS = [field for field in AGGREGATE_FIELDS if field.endswith("_last")]
+
+
+def _rollup(source, target, period_start, start_time, end_time) -> int:
+    """
+    Recompute `target` rows from the `source` tier rows in [start_time, end_time).
+
+    Averages are weighted by `sample_count`, extremes use the maximum and
+    cumulative fields the last bucket's value. One grouped query, one upsert.
+    """
+    rows = (
+        source.objects.filter(bucket_start__gte=start_time, bucket_start__lt=end_time)
+        .annotate(rollup_start=period_start)
+        .values("rollup_start")
+        .annotate(
+            rollup_sample_count=Sum("sample_count"),
+            **{
+                f"rollup_{field}": Sum(F(field) * F("sample_count"))
+                / Sum("sample_count")
+                for field in ROLLUP_AVG_FIELDS
+            },
+            **{f"rollup_{field}": Max(field) for field in ROLLUP_MAX_FIELDS},
+            **{
+                f"rollup_{field}": _last_value(field, ordering=("-bucket_start",))
+                for field in ROLLUP_LAST_FIELDS
+            },
+        )
+        .order_by("rollup_start")
+    )
+
+    rollups = [
+        target(
+            bucket_start=row["rollup_start"],
+            **{field: row[f"rollup_{field}"] for field in AGGREGATE_FIELDS},
+        )
+        for row in rows
+    ]
+    if rollups:
+        target.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=["bucket_start"],
+            update_fields=list(AGGREGATE_FIELDS),
+            batch_size=1000,
+        )
+    return len(rollups)
+
+
+def rollup_buckets(bucket_starts: list) -> None:
+    """
+    Refresh the hourly and daily rollups containing the given 5-minute buckets.
+
+    Only the touched hours are recomputed from the 5-minute tier (at most 12
+    rows each) and only the touched Madrid days from the hourly tier (at most
+    24 rows each).
+    """
+    if not bucket_starts:
+        return
+
+    hours = sorted(
+        bucket_start.replace(minute=0, second=0, microsecond=0)
+        for bucket_start in bucket_starts
+    )
+    _rollup(
+        EcowittObservation5Min,
+        EcowittObservation1Hour,
+        Trunc("bucket_start", "hour", tzinfo=dt_timezone.utc),
+        hours[0],
+        hours[-1] + timedelta(hours=1),
+    )
+
+    days = sorted(madrid_days(hours))
+    first_day = datetime(days[0].year, days[0].month, days[0].day, tzinfo=MADRID_TZ)
+    last_day = datetime(days[-1].year, days[-1].month, days[-1].day, tzinfo=MADRID_TZ)
+    _rollup(
+        EcowittObservation1Hour,
+        EcowittObservation1Day,
+        Trunc("bucket_start", "day", tzinfo=MADRID_TZ),
+        first_day,
+        last_day + timedelta(days=1),
+    )
+
+
+def _accumulate_sql() -> str:
+    """
+    Upsert folding one observation into its open bucket, as a single statement.
+
+    Running averages are updated incrementally, maxima with GREATEST and the
+    cumulative fields follow the newest dateutc (ties: latest ingested). No row
+    is written once the bucket has been finalized; RETURNING is then empty.
+    """
+    table = EcowittOpenBucket._meta.db_table
+    finalized_table = EcowittObservation5Min._meta.db_table
+    metric_fields = [field for field in AGGREGATE_FIELDS if field != "sample_count"]
+    updates = ["sample_count = bucket.sample_count + 1"]
+    updates += [
+        f"{field} = bucket.{field} + (EXCLUDED.{field} - bucket.{field})"
+        " / (bucket.sample_count + 1)"
+        for field in ROLLUP_AVG_FIELDS
+    ]
+    updates += [
+        f"{field} = GREATEST(bucket.{field}, EXCLUDED.{field})"
+        for field in ROLLUP_MAX_FIELDS
+    ]
+    updates += [
+        f"{field} = CASE WHEN EXCLUDED.last_dateutc >= bucket.last_dateutc"
+        f" THEN EXCLUDED.{field} ELSE bucket.{field} END"
+        for field in ROLLUP_LAST_FIELDS
+    ]
+    updates.append(
+        "last_dateutc = GREATEST(bucket.last_dateutc, EXCLUDED.last_dateutc)"
+    )
+    columns = ["created_at", "bucket_start", "sample_count", "last_dateutc"]
+    columns += metric_fields
+    placeholders = ", ".join(["now()", "%s", "1", "%s"] + ["%s"] * len(metric_fields))
+    return (
+        f"INSERT INTO {table} AS bucket ({', '.join(columns)}) "
+        f"SELECT {placeholders} WHERE NOT EXISTS "
+        f"(SELECT 1 FROM {finalized_table} WHERE bucket_start = %s) "
+        f"ON CONFLICT (bucket_start) DO UPDATE SET {', '.join(updates)} "
+        "RETURNING bucket.sample_count"
+    )
+
+
+ACCUMULATE_SQL = _accumulate_sql()
+
+# Advisory lock key space of the per-bucket locks (second key: bucket index)
+BUCKET_LOCK_NAMESPACE = 5_000_001
+
+
+def _bucket_lock_id(bucket_start) -> int:
+    return int(bucket_start.timestamp()) // 300
+
+
+def record_observation(observation: EcowittObservation) -> None:
+    """
+    Fold a freshly ingested observation into the accumulator of its bucket.
+
+    The first sample of a bucket schedules its finalization right after the
+    bucket ends. Observations for buckets that are already finalized (or past
+    the finalization delay) are marked dirty for re-aggregation instead.
+    """
+    dateutc = observation.dateutc.astimezone(dt_timezone.utc)
+    bucket_start = _floor_to_5_minutes(dateutc)
+    finalize_at = (
+        bucket_start
+        + timedelta(minutes=5)
+        + timedelta(seconds=_get_finalize_delay_seconds())
+    )
+    if finalize_at <= timezone.now():
+        mark_dirty_bucket(dateutc)
+        return
+
+    params = [bucket_start, dateutc]
+    params += [
+        getattr(observation, field.rsplit("_", 1)[0])
+        for field in AGGREGATE_FIELDS
+        if field != "sample_count"
+    ]
+    params.append(bucket_start)
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Shared with other samples, exclusive with finalization: the upsert
+            # then sees a finalized bucket instead of reopening it
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock_shared(%s, %s)",
+                [BUCKET_LOCK_NAMESPACE, _bucket_lock_id(bucket_start)],
+            )
+            cursor.execute(ACCUMULATE_SQL, params)
+            row = cursor.fetchone()
+    except DatabaseError:
+        # The accumulator misses this sample: recompute the bucket from raw rows
+        mark_dirty_bucket(dateutc)
+        raise
+
+    if row is None:
+        # Finalized early (e.g. by the fallback task): recompute from raw rows
+        mark_dirty_bucket(dateutc)
+    elif row[0] == 1:
+        try:
+            finalize_open_buckets.apply_async(eta=finalize_at, retry=False)
+        except Exception as exc:
+            # aggregate_observations_5min finalizes it on its next run
+            log.warning("Failed to schedule bucket finalization: %s", exc)
+
+
+def _finalize_open_buckets(before) -> int:
+    """Move accumulators of buckets starting before `before` into the 5-min tier."""
+    with transaction.atomic():
+        bucket_starts = list(
+            EcowittOpenBucket.objects.filter(bucket_start__lt=before)
+            .order_by("bucket_start")
+            .values_list("bucket_start", flat=True)
+        )
+        if not bucket_starts:
+            return 0
+        # Waits for samples being folded in; later ones see the bucket finalized
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, lock_id) "
+                "FROM unnest(%s::integer[]) AS lock_id ORDER BY lock_id",
+                [
+                    BUCKET_LOCK_NAMESPACE,
+                    [_bucket_lock_id(bucket_start) for bucket_start in bucket_starts],
+                ],
+            )
+        open_buckets = list(
+            EcowittOpenBucket.objects.select_for_update()
+            .filter(bucket_start__in=bucket_starts)
+            .order_by("bucket_start")
+        )
+        EcowittOpenBucket.objects.filter(
+            pk__in=[open_bucket.pk for open_bucket in open_buckets]
+        ).delete()
+        EcowittObservation5Min.objects.bulk_create(
+            [
+                EcowittObservation5Min(
+                    bucket_start=open_bucket.bucket_start,
+                    **{
+                        field: getattr(open_bucket, field)
+                        for field in AGGREGATE_FIELDS
+                    },
+                )
+                for open_bucket in open_buckets
+            ],
+            update_conflicts=True,
+            unique_fields=["bucket_start"],
+            update_fields=list(AGGREGATE_FIELDS),
+        )
+
+    bucket_starts = [open_bucket.bucket_start for open_bucket in open_buckets]
+    rollup_buckets(bucket_starts)
+    bump_history_versions(madrid_days(bucket_starts))
+    return len(bucket_starts)
+
+
+@shared_task
+@single_flight("aggregation")
+def finalize_open_buckets() -> int | None:
+    """
+    Finalize every ended bucket from its accumulator, without scanning raw rows.
+
+    Scheduled by ingest for the moment each bucket ends. Returns the number of
+    buckets finalized (None when coalesced into a run holding the lock).
+    """
+    finalized = _finalize_open_buckets(_floor_to_5_minutes(timezone.now()))
+    log.info("Finalized %s five-minute buckets from their accumulators", finalized)
+    return finalized
+
+
+def _record_observations(observations: list) -> None:
+    for observation in observations:
+        record_observation(observation)
+
+
+@shared_task
+@single_flight("ingest-buffer")
+def flush_ingest_buffer() -> int | None:
+    """
+    Write observations buffered by ECOWITT_INGEST_MODE=buffered to the database.
+
+    Scheduled by ingest when the buffer stops being empty (plus a periodic
+    safety net) and drained in ECOWITT_INGEST_FLUSH_BATCH_SIZE `bulk_create`
+    batches. Buffered ingest trades visibility for throughput: a POST costs one
+    RPUSH instead of an INSERT, an accumulator upsert and a serialization, but
+    rows reach the raw table and the aggregates up to
+    ECOWITT_INGEST_FLUSH_DELAY_SECONDS later. Its own lock keeps a single
+    flusher, which preserves arrival order. Returns the number of rows written.
+    """
+    flushed = buffer.flush_buffer(on_flushed=_record_observations)
+    log.info("Flushed %s buffered Ecowitt observations", flushed)
+    return flushed
+
+
+@shared_task
+@single_flight("ingest-spool")
+def replay_ingest_spool() -> int | None:
+    """
+    Insert observations spooled to local disk while Postgres was unavailable.
+
+    Scheduled by ingest when it starts a spool file (plus a periodic safety
+    net). While the database is still down the task fails and the spool is
+    kept for the next run. Returns the number of rows replayed.
+    """
+    replayed = spool.replay_spool(on_replayed=_record_observations)
+    if replayed:
+        log.info("Replayed %s spooled Ecowitt observations", replayed)
+    return replayed
+
+
+@shared_task
+@single_flight("aggregation")
+def aggregate_observations_5min(catch_up: bool | None = None) -> int | None:
+    """
+    Aggregate raw observations into 5-minute buckets aligned at :00, :05, :10, ...
+
+    Buckets are normally finalized by `finalize_open_buckets` as soon as they
+    end; this task is the reconciliation fallback. It first finalizes any
+    ended accumulator whose scheduled finalization was lost, then fills
+    buckets that have no aggregate yet from the raw rows.
+
+    Strategy:
+    - Determine the most recent completed bucket end (now floored to 5m).
+    - Find the last aggregated bucket_start; aggregate any missing buckets up to latest completed.
+    - For each bucket, compute averages and maxima, and upsert into EcowittObservation5Min.
+
+    When more than ECOWITT_AGGREGATE_CATCHUP_BUCKETS buckets are pending (or
+    `catch_up` is True) all of them are computed in a single grouped query and
+    written with one bulk upsert instead of querying bucket by bucket.
+
+    Already aggregated buckets that ingest marked dirty (late observations,
+    e.g. a station replaying buffered readings) are recomputed first; the
+    number of late rows absorbed is logged and counted in the metrics.
+
+    Overlapping runs (and purges) are serialized by the `aggregation` lock: a
+    call made while it is held returns None and is rerun once by the holder.
+
+    Returns number of buckets aggregated.
+    """
+    now = timezone.now()
+    latest_completed_end = _floor_to_5_minutes(now)
+    finalized = _finalize_open_buckets(latest_completed_end)
+
+    # Identify where to start based on last aggregated bucket
+    last_agg = EcowittObservation5Min.objects.order_by("-bucket_start").first()
+    if last_agg is not None:
+        start_time = last_agg.bucket_start + timedelta(minutes=5)
+    else:
+        # If no aggregations exist, start from the earliest observation floored
+        first_obs = EcowittObservation.objects.order_by("dateutc", "created_at").first()
+        if first_obs is None:
+            return 0
+        start_time = _floor_to_5_minutes(first_obs.dateutc)
+
+    # Buckets before start_time are only revisited when ingest marked them dirty
+    late_rows = _reaggregate_dirty_buckets(before=start_time)
+    if late_rows:
+        LATE_ROWS_ABSORBED.inc(late_rows)
+        log.info("Absorbed %s late observations into aggregated buckets", late_rows)
+
+    if start_time >= latest_completed_end:
+        return finalized
+
+    if catch_up is None:
+        pending_buckets = (latest_completed_end - start_time) // timedelta(minutes=5)
+        catch_up = pending_buckets > _get_catchup_threshold_buckets()
+
+    if catch_up:
+        aggregated = _aggregate_buckets_set_based(start_time, latest_completed_end)
+    else:
+        aggregated = _aggregate_buckets_per_bucket(start_time, latest_completed_end)
+
     log.info(
-        "Aggregated %s five-minute buckets up to %s", aggregated, latest_completed_end
+        "Aggregated %s five-minute buckets up to %s (catch_up=%s)",
+        aggregated,
+        latest_completed_end,
+        catch_up,
     )
-    return aggregated
+    return finalized + aggregated
@@ -1,10 +1,20 @@
 from django.urls import path
 
-from .views import EcowittIngestView, EcowittRealtimeView, EcowittHistoryView
+from .views import (
+    EcowittIngestView,
+    EcowittRealtimeView,
+    EcowittHistoryView,
+    EcowittMetricsView,
+    EcowittBackfillView,
+    ecowitt_stream,
+)
 
 
 urlpatterns = [
     path("", EcowittIngestView.as_view(), name="ecowitt-ingest"),
     path("realtime", EcowittRealtimeView.as_view(), name="ecowitt-realtime"),
     path("history", EcowittHistoryView.as_view(), name="ecowitt-history"),
+    path("stream", ecowitt_stream, name="ecowitt-stream"),
+    path("metrics", EcowittMetricsView.as_view(), name="ecowitt-metrics"),
+    path("backfill", EcowittBackfillView.as_view(), name="ecowitt-backfill"),
 ]
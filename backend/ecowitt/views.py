@@ -1,46 +1,197 @@
 import os
-from datetime import datetime, timedelta, timezone
-from zoneinfo import ZoneInfo
+import zlib
+from dataclasses import asdict
+from datetime import date, datetime, timedelta, timezone
 
+import numpy as np
+from django.db import DatabaseError
 from django.utils.dateparse import parse_datetime
-from django.http import QueryDict
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import status
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes
 
 from .serializers import (
+    HISTORY_COLUMN_FIELDS,
     EcowittObservationSerializer,
+    EcowittObservation1DaySerializer,
+    EcowittObservation1HourSerializer,
     EcowittObservation5MinSerializer,
+    history_columns,
+    observation_representation,
+    parse_observation,
+)
+from .permissions import (
+    HasServiceToken,
+    IsAuthenticatedOrHasServiceToken,
+    has_valid_service_token,
+)
+from .cache import (
+    MADRID_TZ,
+    get_cached_history,
+    get_history_version,
+    get_latest_observation,
+    history_cache_key,
+    set_cached_history,
+    set_latest_observation,
+)
+from . import archive, metrics, spool
+from .backfill import BackfillError, import_observations
+from .downsampling import lttb_indices
+from .stream import observation_events, publish_observation
+from .buffer import buffer_observation, get_flush_delay_seconds, get_ingest_mode
+from .tasks import (
+    _get_aggregate_retention_days,
+    _get_daily_retention_days,
+    _get_hourly_retention_days,
+    flush_ingest_buffer,
+    record_observation,
+    replay_ingest_spool,
+)
+from .models import (
+    EcowittObservation,
+    EcowittObservation1Day,
+    EcowittObservation1Hour,
+    EcowittObservation5Min,
 )
-from .permissions import IsAuthenticatedOrHasServiceToken
-from .models import EcowittObservation, EcowittObservation5Min
 
 import logging
 
 log = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------- #
+#                         CONDITIONAL GET VALIDATORS                           #
+# ---------------------------------------------------------------------------- #
+# Evaluated after authentication; a matching request returns 304 without
+# running the main query or the serializer.
+
+
+def _latest_dateutc(request) -> datetime | None:
+    """Latest observation's dateutc, from the cache or an index-only lookup."""
+    if not hasattr(request, "_ecowitt_latest_dateutc"):
+        cached = get_latest_observation()
+        if cached is not None:
+            latest = parse_datetime(cached["dateutc"])
+        else:
+            latest = (
+                EcowittObservation.objects.order_by("-dateutc", "-created_at")
+                .values_list("dateutc", flat=True)
+                .first()
+            )
+        request._ecowitt_latest_dateutc = latest
+    return request._ecowitt_latest_dateutc
+
+
+def _realtime_etag(request, *args, **kwargs) -> str | None:
+    latest = _latest_dateutc(request)
+    return f'W/"{int(latest.timestamp())}"' if latest else None
+
+
+def _realtime_last_modified(request, *args, **kwargs) -> datetime | None:
+    return _latest_dateutc(request)
+
+
+def _history_version(request, start_day: date, end_day: date) -> str | None:
+    """Aggregation version of the requested days, read once per request."""
+    if not hasattr(request, "_ecowitt_history_version"):
+        request._ecowitt_history_version = get_history_version(start_day, end_day)
+    return request._ecowitt_history_version
+
+
+def _history_etag(request, *args, **kwargs) -> str | None:
+    try:
+        start_day, end_day, max_points = _parse_history_params(request.GET)
+        columns = _parse_history_columns(request.GET)
+        tier = _parse_history_tier(request.GET, start_day, end_day)
+    except ValueError:
+        # Let the view report the invalid parameters
+        return None
+    version = _history_version(request, start_day, end_day)
+    if not version:
+        return None
+    layout = zlib.crc32(",".join(columns).encode()) if columns else "rows"
+    return (
+        f'W/"{start_day.isoformat()}.{end_day.isoformat()}.{max_points}.'
+        f'{layout}.{tier}.{version}"'
+    )
+
+
+def _revalidate(response):
+    # Browsers keep the body but revalidate (If-None-Match) on every request
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
 class EcowittIngestView(APIView):
     """
     Receives Ecowitt station payloads and stores observations.
     The endpoint is unauthenticated but validates using ECOWITT_STATION_PASSKEY.
+    Payloads are parsed by the lean ingest schema (`parse_observation`) and
+    acknowledged with a minimal body. With ECOWITT_INGEST_MODE=buffered, valid
+    payloads are queued for `flush_ingest_buffer` and acknowledged with 202.
+    When Postgres fails or is too slow, observations go to the local disk spool
+    (also 202) and `replay_ingest_spool` inserts them later, in order.
+    Observations are unique by dateutc: a retried one is acknowledged with 200
+    and otherwise ignored.
     """
 
     permission_classes = [AllowAny]
 
-    def _ingest(self, payload: dict):
+    def _buffer(self, values: dict, observation_data: dict):
+        try:
+            length = buffer_observation(values)
+        except Exception as exc:
+            log.warning("Ingest buffer unavailable; storing synchronously: %s", exc)
+            return None
+
+        if length == 1:
+            # The flusher drains until empty, so only the first entry schedules it
+            try:
+                flush_ingest_buffer.apply_async(
+                    countdown=get_flush_delay_seconds(), retry=False
+                )
+            except Exception as exc:
+                # The periodic flush picks the buffer up
+                log.warning("Failed to schedule ingest buffer flush: %s", exc)
+
+        return self._accepted(observation_data)
+
+    def _spool(self, values: dict, observation_data: dict):
+        try:
+            started = spool.spool_observation(values)
+        except OSError as exc:
+            log.error("Failed to spool observation: %s", exc)
+            return Response(
+                {"detail": "Observation could not be stored"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        if started:
+            try:
+                replay_ingest_spool.apply_async(
+                    countdown=spool.get_replay_delay_seconds(), retry=False
+                )
+            except Exception as exc:
+                # The periodic replay picks the spool up
+                log.warning("Failed to schedule ingest spool replay: %s", exc)
+        return self._accepted(observation_data)
+
+    def _accepted(self, observation_data: dict):
+        # Stored later, but already live on the realtime endpoint and the stream,
+        # unless a station retry or replay delivers an older reading
+        if set_latest_observation(observation_data):
+            publish_observation(observation_data)
+        return Response({"detail": "Accepted"}, status=status.HTTP_202_ACCEPTED)
+
+    def _ingest(self, payload):
         expected_passkey = os.getenv("ECOWITT_STATION_PASSKEY")
-        # DRF can give us a QueryDict for form-encoded submissions; flatten it
-        if isinstance(payload, QueryDict):
-            received_passkey = payload.get("PASSKEY")
-            data = payload.dict()
-        else:
-            received_passkey = payload.get("PASSKEY")
-            # If values are lists (e.g., from dict(QueryDict)), take the first item
-            data = {k: (v[0] if isinstance(v, list) else v) for k, v in payload.items()}
-        log.debug(f"Payload (flattened): {data}")
+        received_passkey = payload.get("PASSKEY")
+        log.debug("Payload: %s", payload)
 
         if not expected_passkey:
             return Response(
@@ -53,24 +204,53 @@ class EcowittIngestView(APIView):
                 {"detail": "Invalid passkey"}, status=status.HTTP_403_FORBIDDEN
             )
 
-        # Remove PASSKEY from validated data; it's not stored
-        data.pop("PASSKEY", None)
+        # One pass over the 28 station fields; PASSKEY is not part of the schema
+        values, errors = parse_observation(payload)
+        if errors:
+            log.error("Invalid payload: %s", errors)
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = EcowittObservationSerializer(data=data)
-        if serializer.is_valid():
-            observation = serializer.save()
-            return Response(
-                EcowittObservationSerializer(observation).data,
-                status=status.HTTP_201_CREATED,
-            )
+        observation_data = observation_representation(values)
+        if get_ingest_mode() == "buffered":
+            response = self._buffer(values, observation_data)
+            if response is not None:
+                return response
 
-        log.error(f"Invalid payload: {serializer.errors}")
+        if spool.has_pending():
+            # Spooled observations are replayed first, so keep queueing behind them
+            return self._spool(values, observation_data)
+        try:
+            with spool.bounded_write():
+                inserted = EcowittObservation.objects.insert_new(
+                    [EcowittObservation(**values)]
+                )
+        except DatabaseError as exc:
+            log.warning("Failed to store observation; spooling it: %s", exc)
+            return self._spool(values, observation_data)
+        if not inserted:
+            # A retried reading: already stored, aggregated and published
+            log.info("Ignoring duplicate observation at %s", values["dateutc"])
+            return Response({"detail": "Already stored"}, status=status.HTTP_200_OK)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        observation = inserted[0]
+
+        try:
+            record_observation(observation)
+        except DatabaseError as exc:
+            # Marked dirty: the reconciliation re-aggregates it from raw rows
+            log.warning("Failed to record observation for aggregation: %s", exc)
+        # Keep the realtime endpoint's cache warm and notify stream subscribers
+        set_latest_observation(observation_data)
+        publish_observation(observation_data)
+        return Response({"detail": "Created"}, status=status.HTTP_201_CREATED)
 
     @extend_schema(
         request=EcowittObservationSerializer,
-        responses={201: EcowittObservationSerializer},
+        responses={
+            200: OpenApiTypes.OBJECT,
+            201: OpenApiTypes.OBJECT,
+            202: OpenApiTypes.OBJECT,
+        },
         description="Ingest Ecowitt observation payload via POST",
     )
     def post(self, request, *args, **kwargs):
@@ -80,6 +260,8 @@ class EcowittIngestView(APIView):
 class EcowittRealtimeView(APIView):
     """
     Returns the latest Ecowitt observation. Authentication required.
+    The payload is served from the shared cache populated on ingest.
+    Supports conditional GET (ETag / Last-Modified from the latest dateutc).
     """
 
     permission_classes = [IsAuthenticatedOrHasServiceToken]
@@ -107,7 +289,18 @@ class EcowittRealtimeView(APIView):
             ),
         ],
     )
+    @method_decorator(
+        condition(etag_func=_realtime_etag, last_modified_func=_realtime_last_modified)
+    )
     def get(self, request, *args, **kwargs):
+        return _revalidate(self._latest_response())
+
+    def _latest_response(self):
+        # Served from the cache written on ingest; the database is only hit on a cold cache
+        cached = get_latest_observation()
+        if cached is not None:
+            return Response(cached)
+
         observation = EcowittObservation.objects.order_by(
             "-dateutc", "-created_at"
         ).first()
@@ -116,14 +309,216 @@ class EcowittRealtimeView(APIView):
                 {"detail": "No observations available"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        return Response(EcowittObservationSerializer(observation).data)
+        observation_data = EcowittObservationSerializer(observation).data
+        set_latest_observation(observation_data)
+        return Response(observation_data)
+
+
+async def ecowitt_stream(request):
+    """
+    Server-Sent Events stream of newly ingested observations.
+    Same access rules as the realtime endpoint. Requires serving through ASGI.
+    """
+    if request.method != "GET":
+        return JsonResponse(
+            {"detail": f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+
+    user = await request.auser()
+    if not user.is_authenticated and not has_valid_service_token(request.META):
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    response = StreamingHttpResponse(
+        observation_events(), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Disable proxy buffering (nginx) so events are delivered immediately
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+HISTORY_CACHE_HITS = metrics.Counter(
+    "history_cache_hits", "History responses served from the per-day cache"
+)
+HISTORY_CACHE_MISSES = metrics.Counter(
+    "history_cache_misses", "History responses built from the database"
+)
+
+# Entries that include the current day are replaced on every aggregation anyway
+HISTORY_CACHE_OPEN_TIMEOUT = 60
+
+
+def _get_history_cache_timeout() -> int:
+    raw_value = os.getenv("ECOWITT_HISTORY_CACHE_TIMEOUT", "")
+    if not raw_value:
+        # Default to caching completed days for 7 days
+        return 7 * 24 * 60 * 60
+    try:
+        return max(int(raw_value), 0)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_HISTORY_CACHE_TIMEOUT='%s'. Falling back to 7 days.",
+            raw_value,
+        )
+        return 7 * 24 * 60 * 60
+
+
+def _get_history_max_range_days() -> int:
+    raw_value = os.getenv("ECOWITT_HISTORY_MAX_RANGE_DAYS", "")
+    if not raw_value:
+        # Default to one year
+        return 366
+    try:
+        return max(int(raw_value), 1)
+    except ValueError:
+        log.warning(
+            "Invalid ECOWITT_HISTORY_MAX_RANGE_DAYS='%s'. Falling back to 366.",
+            raw_value,
+        )
+        return 366
+
+
+def _parse_day(raw_value: str, name: str) -> date:
+    try:
+        # Parse YYYY-MM-DD
+        return datetime.strptime(raw_value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' format. Use YYYY-MM-DD")
+
+
+def _parse_history_params(query_params) -> tuple[date, date, int | None]:
+    """Parse the history window and downsampling target.
+
+    Returns (start_day, end_day, max_points); raises ValueError with a message
+    suitable for a 400 response.
+    """
+    date_raw = query_params.get("date")
+    start_raw = query_params.get("start")
+    end_raw = query_params.get("end")
+
+    if date_raw:
+        try:
+            start_day = end_day = datetime.strptime(date_raw, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError("Invalid date format. Use YYYY-MM-DD")
+    elif start_raw and end_raw:
+        start_day = _parse_day(start_raw, "start")
+        end_day = _parse_day(end_raw, "end")
+        if end_day < start_day:
+            raise ValueError("'end' must not be before 'start'")
+        max_range_days = _get_history_max_range_days()
+        if (end_day - start_day).days + 1 > max_range_days:
+            raise ValueError(f"Range cannot exceed {max_range_days} days")
+    else:
+        raise ValueError(
+            "'date' or both 'start' and 'end' query parameters are required (YYYY-MM-DD)"
+        )
+
+    max_points = None
+    max_points_raw = query_params.get("max_points")
+    if max_points_raw:
+        try:
+            max_points = int(max_points_raw)
+        except ValueError:
+            max_points = 0
+        if max_points < 3:
+            raise ValueError("'max_points' must be an integer >= 3")
+
+    return start_day, end_day, max_points
+
+
+def _parse_history_columns(query_params) -> list[str] | None:
+    """Metrics of the columnar layout, or None for the default list of rows."""
+    layout = query_params.get("layout", "rows")
+    if layout == "rows":
+        return None
+    if layout != "columnar":
+        raise ValueError("'layout' must be 'rows' or 'columnar'")
+
+    fields_raw = query_params.get("fields")
+    if not fields_raw:
+        return list(HISTORY_COLUMN_FIELDS)
+    fields = [field.strip() for field in fields_raw.split(",") if field.strip()]
+    unknown = [field for field in fields if field not in HISTORY_COLUMN_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown 'fields': {', '.join(unknown) or fields_raw}")
+    return fields
+
+
+# Aggregation tier of the history endpoint: model and row serializer
+HISTORY_TIERS = {
+    "5min": (EcowittObservation5Min, EcowittObservation5MinSerializer),
+    "hour": (EcowittObservation1Hour, EcowittObservation1HourSerializer),
+    "day": (EcowittObservation1Day, EcowittObservation1DaySerializer),
+}
+# Retention of each tier; older buckets are read from the cold archive
+HISTORY_TIER_RETENTION_DAYS = {
+    "5min": _get_aggregate_retention_days,
+    "hour": _get_hourly_retention_days,
+    "day": _get_daily_retention_days,
+}
+# Longest span served from each finer tier when the tier is picked automatically
+HISTORY_5MIN_MAX_DAYS = 7
+HISTORY_HOURLY_MAX_DAYS = 92
+
+
+def _parse_history_tier(query_params, start_day: date, end_day: date) -> str:
+    """Explicit `tier`, or the finest tier that keeps the span reasonably sized."""
+    tier = query_params.get("tier")
+    if tier:
+        if tier not in HISTORY_TIERS:
+            raise ValueError(f"'tier' must be one of: {', '.join(HISTORY_TIERS)}")
+        return tier
+
+    span_days = (end_day - start_day).days + 1
+    if span_days <= HISTORY_5MIN_MAX_DAYS:
+        return "5min"
+    if span_days <= HISTORY_HOURLY_MAX_DAYS:
+        return "hour"
+    return "day"
+
+
+def _merge_archived(rows: list, archived: list, key) -> list:
+    """Database rows plus archived ones not (or no longer) in the database."""
+    live = {key(row) for row in rows}
+    return sorted(
+        rows + [row for row in archived if key(row) not in live], key=key
+    )
+
+
+def _downsample(buckets: list, max_points: int) -> list:
+    """Keep at most `max_points` buckets, preserving the shape of every series."""
+    if len(buckets) <= max_points:
+        return buckets
+    fields = [
+        field
+        for field in EcowittObservation5MinSerializer.Meta.fields
+        if field not in ("bucket_start", "sample_count")
+    ]
+    x = np.array([bucket.bucket_start.timestamp() for bucket in buckets])
+    ys = np.array(
+        [[getattr(bucket, field) for field in fields] for bucket in buckets],
+        dtype=float,
+    )
+    return [buckets[index] for index in lttb_indices(x, ys, max_points)]
 
 
 class EcowittHistoryView(APIView):
     """
-    Returns aggregated 5-minute observations for a given date in Madrid timezone.
+    Returns aggregated observations (5-minute, hourly or daily tier) for a date
+    or a range of dates in Madrid timezone, optionally downsampled. Buckets
+    past the tier's retention are read from the cold archive.
+    Supports conditional GET: the ETag is the days' aggregation version.
     Query params:
       - date: YYYY-MM-DD (interpreted in Europe/Madrid; 00:00 to next day 00:00)
+      - start, end: YYYY-MM-DD, inclusive Madrid-local days (instead of date)
+      - max_points: optional maximum number of buckets to return (LTTB)
+      - layout: rows (default) or columnar; fields: columnar metric projection
+      - tier: 5min, hour or day (picked from the span when omitted)
     """
 
     permission_classes = [IsAuthenticated]
@@ -134,55 +529,247 @@ class EcowittHistoryView(APIView):
                 name="date",
                 type=OpenApiTypes.DATE,
                 location=OpenApiParameter.QUERY,
-                required=True,
+                required=False,
                 description=(
                     "Date in format YYYY-MM-DD. Interpreted in Europe/Madrid; "
                     "returns 5-minute aggregates from 00:00 to 23:59 for that local day."
                 ),
             ),
+            OpenApiParameter(
+                name="start",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description=(
+                    "First day (YYYY-MM-DD, Europe/Madrid) of a range. "
+                    "Used with 'end' instead of 'date'."
+                ),
+            ),
+            OpenApiParameter(
+                name="end",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Last day (YYYY-MM-DD, Europe/Madrid, inclusive) of a range.",
+            ),
+            OpenApiParameter(
+                name="tier",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=list(HISTORY_TIERS),
+                description=(
+                    "Aggregation tier. Defaults to 5-minute buckets for spans up to "
+                    "7 days, hourly up to 92 days and daily beyond. The tier used "
+                    "is returned in the X-Ecowitt-Tier header."
+                ),
+            ),
+            OpenApiParameter(
+                name="layout",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                enum=["rows", "columnar"],
+                description=(
+                    "'rows' (default): list of buckets. 'columnar': object with a "
+                    "'bucket_start' array plus one array per metric."
+                ),
+            ),
+            OpenApiParameter(
+                name="fields",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description=(
+                    "Comma-separated metrics to include in the columnar layout "
+                    "(defaults to all)."
+                ),
+            ),
+            OpenApiParameter(
+                name="max_points",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description=(
+                    "Maximum number of buckets to return. Longer series are "
+                    "downsampled with Largest-Triangle-Three-Buckets."
+                ),
+            ),
         ],
         responses={200: EcowittObservation5MinSerializer(many=True)},
         description=(
-            "Get aggregated 5-minute observations for a given date in Madrid timezone"
+            "Get aggregated 5-minute observations for a date or date range in "
+            "Madrid timezone"
         ),
     )
+    @method_decorator(condition(etag_func=_history_etag))
     def get(self, request, *args, **kwargs):
-        date_raw = request.query_params.get("date")
-
-        if not date_raw:
-            return Response(
-                {"detail": "'date' query parameter is required (YYYY-MM-DD)"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        return _revalidate(self._history_response(request))
 
+    def _history_response(self, request):
         try:
-            # Parse YYYY-MM-DD
-            target_date = datetime.strptime(date_raw, "%Y-%m-%d").date()
-        except ValueError:
+            start_day, end_day, max_points = _parse_history_params(
+                request.query_params
+            )
+            columns = _parse_history_columns(request.query_params)
+            tier = _parse_history_tier(request.query_params, start_day, end_day)
+        except ValueError as exc:
             return Response(
-                {"detail": "Invalid date format. Use YYYY-MM-DD"},
+                {"detail": str(exc)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        madrid_tz = ZoneInfo("Europe/Madrid")
         start_local = datetime(
-            target_date.year,
-            target_date.month,
-            target_date.day,
+            start_day.year,
+            start_day.month,
+            start_day.day,
             0,
             0,
             0,
-            tzinfo=madrid_tz,
+            tzinfo=MADRID_TZ,
         )
-        next_day_local = start_local + timedelta(days=1)
+        end_local = datetime(
+            end_day.year,
+            end_day.month,
+            end_day.day,
+            0,
+            0,
+            0,
+            tzinfo=MADRID_TZ,
+        ) + timedelta(days=1)
+
+        # Finished payloads are cached under the days' aggregation version
+        version = _history_version(request, start_day, end_day)
+        cache_key = None
+        if version:
+            cache_key = history_cache_key(
+                version, start_day, end_day, max_points, columns, tier
+            )
+            cached = get_cached_history(cache_key)
+            if cached is not None:
+                HISTORY_CACHE_HITS.inc()
+                return Response(cached, headers={"X-Ecowitt-Tier": tier})
+            HISTORY_CACHE_MISSES.inc()
 
         # Convert local window to UTC for querying stored UTC bucket_start
         start_utc = start_local.astimezone(timezone.utc)
-        next_day_utc = next_day_local.astimezone(timezone.utc)
+        end_utc = end_local.astimezone(timezone.utc)
+        data = self._build_history(tier, start_utc, end_utc, max_points, columns)
 
-        queryset = EcowittObservation5Min.objects.filter(
-            bucket_start__gte=start_utc, bucket_start__lt=next_day_utc
+        if cache_key:
+            # Completed days only change on re-aggregation; today changes every 5 minutes
+            timeout = HISTORY_CACHE_OPEN_TIMEOUT
+            if end_local <= datetime.now(tz=MADRID_TZ):
+                timeout = _get_history_cache_timeout()
+            set_cached_history(cache_key, data, timeout=timeout)
+        return Response(data, headers={"X-Ecowitt-Tier": tier})
+
+    def _build_history(self, tier, start_utc, end_utc, max_points, columns):
+        model, serializer_class = HISTORY_TIERS[tier]
+        queryset = model.objects.filter(
+            bucket_start__gte=start_utc, bucket_start__lt=end_utc
         ).order_by("bucket_start", "created_at")
 
-        serializer = EcowittObservation5MinSerializer(queryset, many=True)
-        return Response(serializer.data)
+        # Buckets past the tier's retention only survive in the cold archive
+        archived = []
+        retention_days = HISTORY_TIER_RETENTION_DAYS[tier]()
+        if start_utc < datetime.now(tz=timezone.utc) - timedelta(days=retention_days):
+            archived = archive.load_archived(model, start_utc, end_utc)
+
+        if columns is not None:
+            # Plain tuples straight from the database; no model instances
+            rows = list(queryset.values_list("bucket_start", *columns))
+            if archived:
+                rows = _merge_archived(
+                    rows,
+                    [
+                        (bucket.bucket_start, *(getattr(bucket, c) for c in columns))
+                        for bucket in archived
+                    ],
+                    key=lambda row: row[0],
+                )
+            if max_points and len(rows) > max_points:
+                x = np.array([row[0].timestamp() for row in rows])
+                ys = np.array([row[1:] for row in rows], dtype=float)
+                rows = [rows[index] for index in lttb_indices(x, ys, max_points)]
+            return history_columns(rows, columns)
+
+        if archived:
+            queryset = _merge_archived(
+                list(queryset), archived, key=lambda bucket: bucket.bucket_start
+            )
+        if max_points:
+            queryset = _downsample(list(queryset), max_points)
+
+        # Plain list (not ReturnList) so it can be cached without the serializer
+        return list(serializer_class(queryset, many=True).data)
+
+
+# Content types accepted by the backfill endpoint, by import format
+BACKFILL_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+class EcowittBackfillView(APIView):
+    """
+    Bulk import of historical observations (console or SD-card logger exports).
+    Staff users or service tokens only.
+    The body is CSV (text/csv, header row with the station field names) or
+    NDJSON (application/x-ndjson), gzip-compressed when sent with
+    `Content-Encoding: gzip`. Rows are streamed, validated like ingest,
+    loaded with COPY and deduplicated on dateutc; their buckets are queued for
+    re-aggregation.
+    """
+
+    permission_classes = [IsAdminUser | HasServiceToken]
+
+    @extend_schema(
+        request={
+            "text/csv": OpenApiTypes.BINARY,
+            "application/x-ndjson": OpenApiTypes.BINARY,
+        },
+        responses={200: OpenApiTypes.OBJECT},
+        description="Import historical Ecowitt observations from CSV or NDJSON",
+    )
+    def post(self, request, *args, **kwargs):
+        content_type = request.content_type.split(";")[0].strip().lower()
+        fmt = BACKFILL_CONTENT_TYPES.get(content_type)
+        if fmt is None:
+            return Response(
+                {
+                    "detail": "Content-Type must be one of: "
+                    + ", ".join(BACKFILL_CONTENT_TYPES)
+                },
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        if request.stream is None:
+            return Response(
+                {"detail": "Empty request body"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        compressed = request.headers.get("Content-Encoding", "").lower() == "gzip"
+        try:
+            result = import_observations(request.stream, fmt, compressed=compressed)
+        except BackfillError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(asdict(result))
+
+
+class EcowittMetricsView(APIView):
+    """
+    Returns the ecowitt operational metrics (cache hit/miss counters, task
+    runs, ...). Staff users or service tokens only.
+    """
+
+    permission_classes = [IsAdminUser | HasServiceToken]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Get ecowitt operational metrics",
+    )
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.snapshot())
@@ -1,6 +1,9 @@
 import os
+import uuid
 import requests
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 log = logging.getLogger(__name__)
 
@@ -8,12 +11,98 @@ log = logging.getLogger(__name__)
 from celery import shared_task
 
 
+def _get_number_env(name: str, default: int | float) -> int | float:
+    raw_value = os.getenv(name, "")
+    if not raw_value:
+        return default
+    try:
+        return max(type(default)(raw_value), 0)
+    except ValueError:
+        log.warning("Invalid %s='%s'. Falling back to %s.", name, raw_value, default)
+        return default
+
+
+def _get_timeout() -> tuple[float, float]:
+    # (connect, read): a stalled API must not pin the single worker
+    return (
+        _get_number_env("LOOPS_CONNECT_TIMEOUT_SECONDS", 3.05),
+        _get_number_env("LOOPS_READ_TIMEOUT_SECONDS", 10.0),
+    )
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=_get_number_env("LOOPS_MAX_RETRIES", 3),
+        # POSTs are not idempotent: retry only when the request never reached
+        # the API (connection errors) or was explicitly refused before being
+        # processed (429/503). A 502/504 may come after the email was sent.
+        read=0,
+        status_forcelist=(429, 503),
+        allowed_methods=None,
+        backoff_factor=_get_number_env("LOOPS_RETRY_BACKOFF_SECONDS", 0.5),
+        backoff_jitter=_get_number_env("LOOPS_RETRY_BACKOFF_JITTER_SECONDS", 0.5),
+        backoff_max=10,
+        # Retry-After is not capped by backoff_max and could pin the worker
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=4)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# One keep-alive connection pool per process, shared by every LoopsClient
+_session: requests.Session | None = None
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = _build_session()
+    return _session
+
+
+def _reset_session() -> None:
+    # A forked worker must not share the parent's sockets
+    global _session
+    _session = None
+
+
+os.register_at_fork(after_in_child=_reset_session)
+
+
 class LoopsClient:
     # Constructor
     def __init__(self):
         self.api_key = os.getenv("LOOPS_API_KEY", "")
         if not self.api_key:
             raise ValueError("Loops API key not set")
+        self.base_url = os.getenv(
+            "LOOPS_API_BASE_URL", "https://app.loops.so/api/v1"
+        ).rstrip("/")
+
+    def _post(self, path: str, payload: dict) -> requests.Response:
+        """
+        POST to the Loops API over the pooled session.
+
+        Connections are kept alive across calls (no TLS handshake per email),
+        every attempt is bounded by the connect and read timeouts, and
+        connection errors and 429/503 responses are retried a few times with
+        jittered exponential backoff. Every attempt carries the same
+        Idempotency-Key, so the API can drop a repeated attempt.
+        """
+        return get_session().post(
+            f"{self.base_url}{path}",
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+                "Idempotency-Key": str(uuid.uuid4()),
+            },
+            json=payload,
+            timeout=_get_timeout(),
+        )
 
     # ---------------------------------------------------------------------------- #
     #                             TRANSACTIONAL EMAILS                             #
@@ -36,7 +125,7 @@ class LoopsClient:
         # Returns:
         #     bool: True if the email was sent successfully, False otherwise
         """
-        endpoint = "https://app.loops.so/api/v1/transactional"
+        endpoint = "/transactional"
 
         payload = {
             "transactionalId": transactional_id,
@@ -45,14 +134,7 @@ class LoopsClient:
         }
 
         try:
-            response = requests.post(
-                endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
+            response = self._post(endpoint, payload)
 
             # Parse the response's success
             # {'success': False}
@@ -89,7 +171,7 @@ class LoopsClient:
         Args:
             See https://loops.so/docs/api-reference/create-contact#request
         """
-        endpoint = "https://app.loops.so/api/v1/contacts/create"
+        endpoint = "/contacts/create"
 
         payload = {
             "email": email,
@@ -104,14 +186,7 @@ class LoopsClient:
         }
 
         try:
-            response = requests.post(
-                endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
+            response = self._post(endpoint, payload)
 
             log.debug(response.json())
 
@@ -138,7 +213,7 @@ class LoopsClient:
         Args:
             See https://loops.so/docs/api-reference/update-contact
         """
-        endpoint = "https://app.loops.so/api/v1/contacts/update"
+        endpoint = "/contacts/update"
 
         payload = {
             "email": email,
@@ -153,14 +228,7 @@ class LoopsClient:
         }
 
         try:
-            response = requests.post(
-                endpoint,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
+            response = self._post(endpoint, payload)
 
             log.debug(response.json())
 
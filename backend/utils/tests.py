@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from . import loops
+from .loops import LoopsClient
+
+
+class StubLoopsServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Loops API, counting connections and requests.
+
+    `statuses` is consumed one per request (then 200), `latency` delays each
+    response, as a slow API would.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, statuses=()):
+        super().__init__(("127.0.0.1", 0), StubLoopsHandler)
+        self.latency = latency
+        self.statuses = list(statuses)
+        self.connections = 0
+        self.requests = 0
+        self.idempotency_keys = []
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/api/v1"
+
+    def get_request(self):
+        request = super().get_request()
+        with self.lock:
+            self.connections += 1
+        return request
+
+
+class StubLoopsHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the real API
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately: avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.idempotency_keys.append(self.headers.get("Idempotency-Key"))
+            status = server.statuses.pop(0) if server.statuses else 200
+        time.sleep(server.latency)
+        body = json.dumps({"success": status == 200}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status != 200:
+            # Ignored by the client: honouring it would pin the worker
+            self.send_header("Retry-After", "120")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LoopsClientTransportTests(SimpleTestCase):
+    def start_server(self, **kwargs) -> StubLoopsServer:
+        server = StubLoopsServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.enterContext(
+            mock.patch.dict(
+                os.environ,
+                {
+                    "LOOPS_API_KEY": "test-key",
+                    "LOOPS_API_BASE_URL": server.base_url,
+                    "LOOPS_READ_TIMEOUT_SECONDS": "0.5",
+                    "LOOPS_RETRY_BACKOFF_SECONDS": "0.01",
+                    "LOOPS_RETRY_BACKOFF_JITTER_SECONDS": "0.01",
+                },
+            )
+        )
+        # A fresh process-wide session per test
+        loops._reset_session()
+        self.addCleanup(loops._reset_session)
+        return server
+
+    def send(self, count: int = 1) -> list[bool]:
+        # One client per email, as each celery task builds its own
+        return [
+            LoopsClient().send_transactional_email("template", "a@example.com", {})
+            for _ in range(count)
+        ]
+
+    def test_connections_are_reused(self):
+        server = self.start_server()
+        count = 20
+
+        for _ in range(count):
+            # The previous transport: a new connection for every email
+            requests.post(f"{server.base_url}/transactional", json={})
+        unpooled_connections = server.connections
+
+        self.assertEqual(self.send(count), [True] * count)
+        pooled_connections = server.connections - unpooled_connections
+
+        # Each new connection to the real API also pays a TLS handshake
+        self.assertEqual(unpooled_connections, count)
+        self.assertEqual(pooled_connections, 1)
+
+    def test_stalled_api_times_out(self):
+        server = self.start_server(latency=2)
+
+        started = time.perf_counter()
+        self.assertEqual(self.send(), [False])
+
+        # Bounded by the read timeout, and a POST that may have been
+        # processed is not sent again
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual(server.requests, 1)
+
+    def test_transient_errors_are_retried(self):
+        server = self.start_server(statuses=[503, 429])
+
+        self.assertEqual(self.send(), [True])
+        self.assertEqual(server.requests, 3)
+        # Retries of one email share its key
+        self.assertEqual(len(set(server.idempotency_keys)), 1)
+        self.assertIsNotNone(server.idempotency_keys[0])
+
+    def test_gateway_errors_are_not_retried(self):
+        server = self.start_server(statuses=[502, 504])
+
+        # Either may come after the email was sent
+        self.assertEqual(self.send(2), [False, False])
+        self.assertEqual(server.requests, 2)
+
+    def test_retries_are_bounded(self):
+        server = self.start_server(statuses=[503] * 10)
+
+        self.assertEqual(self.send(), [False])
+        # The first attempt plus LOOPS_MAX_RETRIES (3)
+        self.assertEqual(server.requests, 4)